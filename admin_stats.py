@@ -0,0 +1,150 @@
+"""Cross-user statistics for the admin dashboard.
+
+Every figure is a grouped SQL query over whole tables (or a page of users); no
+per-user ORM objects or relationships are loaded.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import case, func, literal
+from models import (db, User, DailyPlan, TimeBlock, Priority, Task, Category, TaskComment,
+                    DayTemplate, DailyCategoryRollup)
+
+FOOTPRINT_SORTS = ('total_rows', 'time_blocks', 'daily_plans', 'priorities', 'tasks', 'task_comments',
+                   'categories', 'templates', 'rollup_rows', 'last_active', 'id')
+
+def get_active_user_counts(now=None):
+    """Total users and users active in the last 1, 7 and 30 days, in one query"""
+    now = now or datetime.utcnow()
+
+    def active_since(days):
+        return func.coalesce(func.sum(case((User.last_active >= now - timedelta(days=days), 1), else_=0)), 0)
+
+    total, day, week, month = db.session.query(
+        func.count(User.id), active_since(1), active_since(7), active_since(30)
+    ).one()
+    return {'total_users': total, 'active_1d': int(day), 'active_7d': int(week), 'active_30d': int(month)}
+
+def get_daily_activity(start_date, end_date):
+    """Plans, time blocks and distinct planning users per plan date, one row per day"""
+    plan_rows = db.session.query(
+        DailyPlan.date,
+        func.count(DailyPlan.id),
+        func.count(func.distinct(DailyPlan.user_id))
+    ).filter(
+        DailyPlan.date.between(start_date, end_date)
+    ).group_by(DailyPlan.date).all()
+    block_rows = db.session.query(
+        DailyPlan.date,
+        func.count(TimeBlock.id),
+        func.coalesce(func.sum(case((TimeBlock.completed == True, 1), else_=0)), 0)
+    ).join(
+        TimeBlock, TimeBlock.daily_plan_id == DailyPlan.id
+    ).filter(
+        DailyPlan.date.between(start_date, end_date)
+    ).group_by(DailyPlan.date).all()
+
+    plans = {day: (count, users) for day, count, users in plan_rows}
+    blocks = {day: (count, int(done)) for day, count, done in block_rows}
+    days = []
+    for offset in range((end_date - start_date).days + 1):
+        day = start_date + timedelta(days=offset)
+        plan_count, users = plans.get(day, (0, 0))
+        block_count, completed = blocks.get(day, (0, 0))
+        days.append({
+            'date': day.isoformat(),
+            'plans': plan_count,
+            'planning_users': users,
+            'time_blocks': block_count,
+            'completed_blocks': completed
+        })
+    return days
+
+def get_top_categories(start_date, end_date, limit=10):
+    """Category names with the most scheduled hours across all users, from the daily rollups"""
+    name = func.lower(Category.name)
+    rows = db.session.query(
+        func.min(Category.name),
+        func.sum(DailyCategoryRollup.planned_minutes),
+        func.sum(DailyCategoryRollup.completed_minutes),
+        func.count(func.distinct(DailyCategoryRollup.user_id))
+    ).join(
+        Category, DailyCategoryRollup.category_id == Category.id
+    ).filter(
+        DailyCategoryRollup.date.between(start_date, end_date)
+    ).group_by(name).order_by(func.sum(DailyCategoryRollup.planned_minutes).desc()).limit(limit).all()
+    return [
+        {
+            'name': category_name,
+            'planned_hours': round((planned or 0) / 60, 1),
+            'completed_hours': round((completed or 0) / 60, 1),
+            'users': users
+        }
+        for category_name, planned, completed, users in rows
+    ]
+
+def _count_by_user(user_column, count_column, join=None, user_ids=None):
+    query = db.session.query(user_column.label('user_id'), func.count(count_column).label('row_count'))
+    if join is not None:
+        query = query.join(*join)
+    if user_ids is not None:
+        query = query.filter(user_column.in_(user_ids))
+    return query.group_by(user_column).subquery()
+
+def get_user_footprints(page=1, per_page=50, sort='total_rows'):
+    """One page of per-user row counts across the main tables.
+
+    Each table is counted with one grouped subquery joined to the users. When the
+    page is ordered by id or last activity, the page of user ids is picked first and
+    the counts are limited to those users; ordering by a count has to aggregate
+    every user once. Returns ``(rows, total_users)``.
+    """
+    user_ids = None
+    if sort in ('id', 'last_active'):
+        order = [User.id] if sort == 'id' else [User.last_active.desc(), User.id]
+        user_ids = [user_id for (user_id,) in db.session.query(User.id).order_by(*order)
+                    .limit(per_page).offset((page - 1) * per_page).all()]
+
+    counts = {
+        'daily_plans': _count_by_user(DailyPlan.user_id, DailyPlan.id, user_ids=user_ids),
+        'time_blocks': _count_by_user(DailyPlan.user_id, TimeBlock.id,
+                                      (TimeBlock, TimeBlock.daily_plan_id == DailyPlan.id), user_ids),
+        'priorities': _count_by_user(DailyPlan.user_id, Priority.id,
+                                     (Priority, Priority.daily_plan_id == DailyPlan.id), user_ids),
+        'tasks': _count_by_user(Task.user_id, Task.id, user_ids=user_ids),
+        'task_comments': _count_by_user(Task.user_id, TaskComment.id,
+                                        (TaskComment, TaskComment.task_id == Task.id), user_ids),
+        'categories': _count_by_user(Category.user_id, Category.id, user_ids=user_ids),
+        'templates': _count_by_user(DayTemplate.user_id, DayTemplate.id, user_ids=user_ids),
+        'rollup_rows': _count_by_user(DailyCategoryRollup.user_id, DailyCategoryRollup.id, user_ids=user_ids)
+    }
+    count_columns = {name: func.coalesce(subquery.c.row_count, 0) for name, subquery in counts.items()}
+    total_rows = sum(count_columns.values(), literal(0))
+
+    query = db.session.query(
+        User.id, User.username, User.email, User.created_at, User.last_active,
+        *[column.label(name) for name, column in count_columns.items()],
+        total_rows.label('total_rows')
+    )
+    for subquery in counts.values():
+        query = query.outerjoin(subquery, subquery.c.user_id == User.id)
+
+    if user_ids is not None:
+        query = query.filter(User.id.in_(user_ids))
+        query = query.order_by(User.id) if sort == 'id' else query.order_by(User.last_active.desc(), User.id)
+    else:
+        sort_column = count_columns.get(sort, total_rows)
+        query = query.order_by(sort_column.desc(), User.id).limit(per_page).offset((page - 1) * per_page)
+
+    total_users = db.session.query(func.count(User.id)).scalar()
+    rows = query.all()
+    return [
+        {
+            'id': row.id,
+            'username': row.username,
+            'email': row.email,
+            'created_at': row.created_at.isoformat() if row.created_at else None,
+            'last_active': row.last_active.isoformat() if row.last_active else None,
+            **{name: int(getattr(row, name)) for name in count_columns},
+            'total_rows': int(row.total_rows)
+        }
+        for row in rows
+    ], total_users
@@ -0,0 +1,120 @@
+"""Columnar time-block analytics.
+
+Blocks are fetched once as typed NumPy arrays (day index, slot index, category id,
+task id, completed) and every rollup is a vectorized bincount over those columns
+instead of a per-block Python loop building nested dicts.
+"""
+from dataclasses import dataclass
+from datetime import date as date_type
+
+import numpy as np
+from sqlalchemy import extract
+
+from models import db, DailyPlan, TimeBlock, Task
+from time_stats import BLOCK_MINUTES
+
+SLOTS_PER_HOUR = 60 // BLOCK_MINUTES
+
+
+@dataclass
+class BlockColumns:
+    """Assigned time blocks for one user and date range, stored column-wise."""
+    start_date: date_type
+    num_days: int
+    day: np.ndarray        # int32, days since start_date
+    slot: np.ndarray       # int16, 15-minute slot of the day (0-95)
+    category: np.ndarray   # int64, category id
+    task: np.ndarray       # int64, task id
+    completed: np.ndarray  # bool
+
+    @property
+    def week(self):
+        """Index of the Monday-based week each block falls in, relative to start_date's week."""
+        return (self.day + self.start_date.weekday()) // 7
+
+
+def load_block_columns(user_id, start_date, end_date, completed_only=False):
+    """Fetch the user's assigned blocks between two dates (inclusive) as typed arrays."""
+    slot_expr = extract('hour', TimeBlock.start_time) * SLOTS_PER_HOUR + extract('minute', TimeBlock.start_time) / BLOCK_MINUTES
+    query = db.session.query(
+        DailyPlan.date,
+        slot_expr,
+        Task.category_id,
+        TimeBlock.task_id,
+        TimeBlock.completed
+    ).select_from(TimeBlock).join(
+        DailyPlan, TimeBlock.daily_plan_id == DailyPlan.id
+    ).join(
+        Task, TimeBlock.task_id == Task.id
+    ).filter(
+        DailyPlan.user_id == user_id,
+        DailyPlan.date.between(start_date, end_date)
+    )
+    if completed_only:
+        query = query.filter(TimeBlock.completed == True)
+
+    rows = query.all()
+    return columns_from_rows(rows, start_date, end_date)
+
+
+def columns_from_rows(rows, start_date, end_date):
+    """Build BlockColumns from (date, slot, category_id, task_id, completed) tuples."""
+    num_days = (end_date - start_date).days + 1
+    if not rows:
+        empty = np.empty(0, dtype=np.int64)
+        return BlockColumns(start_date, num_days, empty.astype(np.int32), empty.astype(np.int16),
+                            empty, empty, empty.astype(bool))
+
+    dates, slots, categories, tasks, completed = zip(*rows)
+    # Ordinals convert far faster than datetime64 parsing of date objects
+    day = np.fromiter(map(date_type.toordinal, dates), dtype=np.int32, count=len(dates)) - start_date.toordinal()
+    return BlockColumns(
+        start_date=start_date,
+        num_days=num_days,
+        day=day,
+        slot=np.array(slots, dtype=np.float64).astype(np.int16),
+        category=np.array(categories, dtype=np.int64),
+        task=np.array(tasks, dtype=np.int64),
+        completed=np.array(completed, dtype=bool)
+    )
+
+
+def _planned_and_completed(index, completed, minlength):
+    planned = np.bincount(index, minlength=minlength) * BLOCK_MINUTES
+    done = np.bincount(index, weights=completed, minlength=minlength).astype(np.int64) * BLOCK_MINUTES
+    return planned, done
+
+
+def _grouped(keys, completed):
+    """Planned/completed minutes per distinct key, as {key: (planned, completed)}."""
+    if keys.size == 0:
+        return {}
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    planned, done = _planned_and_completed(inverse, completed, unique_keys.size)
+    return {int(k): (int(p), int(d)) for k, p, d in zip(unique_keys, planned, done)}
+
+
+def category_rollup(cols):
+    """Planned and completed minutes per category id."""
+    return _grouped(cols.category, cols.completed)
+
+
+def task_rollup(cols):
+    """Planned and completed minutes per task id."""
+    return _grouped(cols.task, cols.completed)
+
+
+def day_rollup(cols):
+    """Planned and completed minutes for every day in the range, as two arrays."""
+    return _planned_and_completed(cols.day, cols.completed, cols.num_days)
+
+
+def week_rollup(cols):
+    """Planned and completed minutes per Monday-based week in the range, as two arrays."""
+    num_weeks = (cols.num_days + cols.start_date.weekday() + 6) // 7
+    return _planned_and_completed(cols.week, cols.completed, num_weeks)
+
+
+def hour_rollup(cols):
+    """Planned and completed minutes per hour of day (24 entries each)."""
+    return _planned_and_completed(cols.slot // SLOTS_PER_HOUR, cols.completed, 24)
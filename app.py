@@ -3,13 +3,36 @@ import logging
 import pytz
 import secrets
 from pathlib import Path
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from functools import wraps
 from flask import Flask, render_template, jsonify, request, redirect, url_for, flash, session, send_from_directory
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, current_user, login_required, login_user, logout_user
-from sqlalchemy import text, func
-from cache_utils import init_cache, cached, invalidate_cache, get_paginated_results
+from sqlalchemy import text, func, or_, and_
+from cache_utils import (init_cache, cached, invalidate_cache, get_paginated_results,
+                         cached_user_data, invalidates_user_data)
+from time_stats import BLOCK_MINUTES, get_category_window_minutes, get_goal_forecast
+from task_analytics import (get_task_summary, get_productive_hours, get_category_performance, get_estimation_accuracy, get_role_analytics,
+                            get_task_leaderboard, count_completed_blocks_by_hour, apply_productive_hour_changes,
+                            apply_task_completion_hours, get_plan_hour_counts)
+from admin_stats import (FOOTPRINT_SORTS, get_active_user_counts, get_daily_activity,
+                         get_top_categories, get_user_footprints)
+from window_stats import PRECOMPUTED_WINDOWS, get_window_totals
+from productivity_analytics import (get_productivity_analytics, get_productivity_insight_messages,
+                                    get_weekday_heatmap, HEATMAP_SLOT_MINUTES, get_trend_series)
+from estimation_stats import task_estimation_sample, apply_estimation_change, get_expected_actual_minutes
+from request_limits import (RangeLimitError, parse_range_days, check_range_cost, statement_timeout,
+                            ADMIN_STATEMENT_TIMEOUT_MS)
+from task_serializer import (TASK_FIELDS, TASK_COLUMNS, DENORMALIZED_FIELDS, load_task_rows, load_task_lookups,
+                             serialize_task, serialize_tasks, normalize_task_lookups)
+from json_provider import OrjsonProvider, ORJSON_ENGINE_OPTIONS
+from search_index import (DOC_TYPES, search_documents, index_task, index_comment, index_daily_plan,
+                          remove_task_documents)
+from task_changes import parse_change_cursor, get_task_change_cursor, mark_tasks_changed, get_task_changes
+from analytics_kernel import load_block_columns, category_rollup, day_rollup, hour_rollup
+from rollups import (refresh_daily_rollups, get_scheduled_dates, get_category_rollup_totals,
+                     get_period_breakdown, get_period_start, get_period_end,
+                     get_plan_task_minutes, apply_task_minute_changes)
 from dateutil.rrule import rrule, rrulestr
 
 # Configure logging with Railway-specific settings
@@ -28,6 +51,7 @@ logger.info("Starting TimeBlocker application...")
 pacific_tz = pytz.timezone('America/Los_Angeles')
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 session_secret = os.environ.get("SESSION_SECRET")
 if not session_secret:
     if os.environ.get('RAILWAY_ENVIRONMENT_NAME'):
@@ -70,6 +94,7 @@ if os.environ.get('RAILWAY_ENVIRONMENT_NAME'):
             "options": "-c default_transaction_isolation=read_committed"
         },
         "echo": False,
+        **ORJSON_ENGINE_OPTIONS,
     }
 else:
     # Default configuration for other environments
@@ -86,6 +111,7 @@ else:
             "options": "-c default_transaction_isolation=read_committed"
         },
         "echo": False,
+        **ORJSON_ENGINE_OPTIONS,
     }
 
 # Import db from models after app is created
@@ -95,7 +121,7 @@ from models import db
 db.init_app(app)
 
 # Import model classes after db initialization
-from models import User, DailyPlan, Priority, TimeBlock, Category, Task, DayTemplate, Role, TaskComment
+from models import User, DailyPlan, Priority, TimeBlock, Category, Task, DayTemplate, Role, TaskComment, DailyCategoryRollup, EstimationStats
 
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -265,6 +291,9 @@ def create_default_categories(user):
     # No default categories - users create their own
     pass
 
+# Categories shown in the work-hour progress panel when the user hasn't picked their own
+DEFAULT_TRACKED_CATEGORIES = ['Work', 'Consulting', 'Church', 'Personal']
+
 def get_current_pacific_date():
     return datetime.now(pacific_tz).date()
 
@@ -410,6 +439,7 @@ def task_dashboard():
 
 @app.route('/api/categories', methods=['GET', 'POST'])
 @login_required
+@invalidates_user_data
 def manage_categories():
     # Handle GET request (Fetch all categories)
     if request.method == 'GET':
@@ -433,12 +463,24 @@ def manage_categories():
 
 @app.route('/api/categories/<int:category_id>', methods=['PUT', 'DELETE'])
 @login_required
+@invalidates_user_data
 def category_operations(category_id):
     category = Category.query.filter_by(id=category_id, user_id=current_user.id).first_or_404()
 
     if request.method == 'DELETE':
-        # Delete all tasks in the category
+        # Remember which days the category's tasks were scheduled so their rollups can be rebuilt
+        category_task_ids = [task_id for (task_id,) in db.session.query(Task.id).filter_by(category_id=category.id).all()]
+        affected_dates = get_scheduled_dates(category_task_ids)
+        remove_task_documents(category_task_ids)
+        mark_tasks_changed(current_user.id, deleted_task_ids=category_task_ids)
+        apply_productive_hour_changes(current_user.id, count_completed_blocks_by_hour(
+            current_user.id, task_ids=category_task_ids
+        ), {})
+        
+        # Delete all tasks in the category, along with their estimation statistics
         Task.query.filter_by(category_id=category.id).delete()
+        EstimationStats.query.filter_by(category_id=category.id).delete()
+        refresh_daily_rollups(current_user.id, affected_dates)
         db.session.delete(category)
         db.session.commit()
         return '', 204
@@ -446,6 +488,11 @@ def category_operations(category_id):
     data = request.json
     category.name = data.get('name', category.name)
     category.color = data.get('color', category.color)
+    # Tasks carry their category's name and color, so a rename reaches clients as task changes
+    if db.session.is_modified(category):
+        mark_tasks_changed(current_user.id, [task_id for (task_id,) in db.session.query(Task.id).filter_by(
+            category_id=category.id
+        ).all()])
     db.session.commit()
     return jsonify({
         'id': category.id,
@@ -453,10 +500,57 @@ def category_operations(category_id):
         'color': category.color
     })
 
+TASK_PAGE_SIZE = 100
+MAX_TASK_PAGE_SIZE = 500
+
+def parse_due_date(value):
+    """ISO due date from a JSON body as naive UTC, the form the database stores and returns"""
+    due_date = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if due_date.tzinfo is not None:
+        due_date = due_date.astimezone(timezone.utc).replace(tzinfo=None)
+    return due_date
+
+def optional_int(value):
+    """Coerce an id from a JSON body (form values arrive as strings) to int, keeping None/blank as None"""
+    return int(value) if value not in (None, '') else None
+
+def block_task_id(block):
+    """A time block dict's task id as int, or None when unset or malformed"""
+    try:
+        return optional_int(block.get('task_id'))
+    except (TypeError, ValueError):
+        return None
+
+def load_block_tasks(user_id, blocks):
+    """The user's own tasks referenced by time block dicts, as {task_id: task}"""
+    task_ids = {block_task_id(block) for block in blocks} - {None}
+    if not task_ids:
+        return {}
+    return {task.id: task for task in Task.query.filter(Task.user_id == user_id, Task.id.in_(task_ids)).all()}
+
+def parse_task_cursor(cursor):
+    """Split a "created_at_id" task list cursor; raises ValueError when malformed"""
+    created_at, task_id = cursor.rsplit('_', 1)
+    return datetime.fromisoformat(created_at), int(task_id)
+
 @app.route('/api/tasks', methods=['GET', 'POST'])
 @login_required
+@invalidates_user_data
 def manage_tasks():
     if request.method == 'GET':
+        # ?fields= trims each task to the listed keys; ?limit=/?after= switch to keyset pages;
+        # ?format=normalized sends categories, roles and badge colors once in side tables
+        fields = [field for field in request.args.get('fields', '').split(',') if field]
+        normalized = request.args.get('format') == 'normalized'
+        available_fields = set(TASK_FIELDS) - set(DENORMALIZED_FIELDS) if normalized else set(TASK_FIELDS)
+        unknown_fields = set(fields) - available_fields
+        if unknown_fields:
+            return jsonify({'error': f'Unknown fields: {", ".join(sorted(unknown_fields))}'}), 400
+        paginated = 'limit' in request.args or 'after' in request.args
+        limit = request.args.get('limit', TASK_PAGE_SIZE, type=int)
+        if paginated and not 1 <= limit <= MAX_TASK_PAGE_SIZE:
+            return jsonify({'error': f'limit must be between 1 and {MAX_TASK_PAGE_SIZE}'}), 400
+
         # Get query parameters for filtering
         status = request.args.get('status')
         priority = request.args.get('priority')
@@ -477,39 +571,37 @@ def manage_tasks():
         if overdue_only:
             query = query.filter(Task.due_date < datetime.utcnow(), Task.completed == False)
         
-        tasks = query.order_by(Task.created_at.desc()).all()
+        # Newest first, keyset-paginated on (created_at, id) so deep pages cost the same as the first
+        if request.args.get('after'):
+            try:
+                after_created_at, after_id = parse_task_cursor(request.args['after'])
+            except ValueError:
+                return jsonify({'error': 'Invalid cursor'}), 400
+            query = query.filter(or_(
+                Task.created_at < after_created_at,
+                and_(Task.created_at == after_created_at, Task.id < after_id)
+            ))
+        query = query.order_by(Task.created_at.desc(), Task.id.desc())
+        # Read before the tasks, so syncing from it can only repeat a concurrent change, never miss it
+        change_cursor = get_task_change_cursor(current_user.id) if paginated or normalized else None
+        tasks = load_task_rows(query.limit(limit + 1) if paginated else query)
+        next_cursor = None
+        if paginated and len(tasks) > limit:
+            tasks = tasks[:limit]
+            last_task = dict(zip(TASK_COLUMNS, tasks[-1]))
+            next_cursor = f"{last_task['created_at'].isoformat()}_{last_task['id']}"
         
-        return jsonify([{
-            'id': task.id,
-            'title': task.title,
-            'description': task.description,
-            'category_id': task.category_id,
-            'category_name': task.category.name,
-            'category_color': task.category.color,
-            'due_date': task.due_date.isoformat() if task.due_date else None,
-            'status': task.status,
-            'status_color': task.get_status_color(),
-            'role_id': task.role_id,
-            'role_name': task.assigned_role.name if task.assigned_role else None,
-            'is_recurring': task.is_recurring,
-            'recurrence_rule': task.recurrence_rule,
-            'priority': task.priority,
-            'priority_color': task.get_priority_color(),
-            'completed': task.completed,
-            'completed_at': task.completed_at.isoformat() if task.completed_at else None,
-            'estimated_minutes': task.estimated_minutes,
-            'actual_minutes': task.actual_minutes,
-            'total_time_spent': task.get_total_time_spent(),
-            'notes': task.notes,
-            'tags': task.tags or [],
-            'dependencies': task.dependencies or [],
-            'progress_percentage': task.progress_percentage,
-            'last_worked_on': task.last_worked_on.isoformat() if task.last_worked_on else None,
-            'parent_task_id': task.parent_task_id,
-            'subtask_count': len(task.subtasks),
-            'is_overdue': task.is_overdue(),
-            'created_at': task.created_at.isoformat()
-        } for task in tasks])
+        lookups = load_task_lookups(current_user.id, tasks)
+        task_list = serialize_tasks(tasks, lookups, fields, normalized)
+        
+        if normalized:
+            payload = {'tasks': task_list, **normalize_task_lookups(lookups), 'change_cursor': change_cursor}
+            if paginated:
+                payload['next_cursor'] = next_cursor
+            return jsonify(payload)
+        if paginated:
+            return jsonify({'tasks': task_list, 'next_cursor': next_cursor, 'change_cursor': change_cursor})
+        return jsonify(task_list)
 
     data = request.json
     # Validate required fields
@@ -520,16 +612,16 @@ def manage_tasks():
         # Parse due_date if provided
         due_date = None
         if data.get('due_date'):
-            due_date = datetime.fromisoformat(data['due_date'].replace('Z', '+00:00'))
+            due_date = parse_due_date(data['due_date'])
         
         task = Task(
             title=data['title'],
             description=data.get('description', ''),
-            category_id=data['category_id'],
+            category_id=int(data['category_id']),
             user_id=current_user.id,
             due_date=due_date,
             status=data.get('status', 'pending'),
-            role_id=data.get('role_id'),
+            role_id=optional_int(data.get('role_id')),
             is_recurring=data.get('is_recurring', False),
             recurrence_rule=data.get('recurrence_rule'),
             priority=data.get('priority', 'medium'),
@@ -537,63 +629,77 @@ def manage_tasks():
             notes=data.get('notes', ''),
             tags=data.get('tags', []),
             dependencies=data.get('dependencies', []),
-            parent_task_id=data.get('parent_task_id')
+            parent_task_id=optional_int(data.get('parent_task_id'))
         )
         db.session.add(task)
+        db.session.flush()
+        index_task(task)
+        mark_tasks_changed(current_user.id, [task.id])
+        # Serialized before the commit expires the instance, so the response needs no refetch
+        task_data = serialize_task(task, load_task_lookups(current_user.id, [task]))
         db.session.commit()
 
-        return jsonify({
-            'id': task.id,
-            'title': task.title,
-            'description': task.description,
-            'category_id': task.category_id,
-            'category_name': task.category.name,
-            'category_color': task.category.color,
-            'due_date': task.due_date.isoformat() if task.due_date else None,
-            'status': task.status,
-            'status_color': task.get_status_color(),
-            'role_id': task.role_id,
-            'is_recurring': task.is_recurring,
-            'recurrence_rule': task.recurrence_rule,
-            'priority': task.priority,
-            'priority_color': task.get_priority_color(),
-            'completed': task.completed,
-            'estimated_minutes': task.estimated_minutes,
-            'notes': task.notes,
-            'tags': task.tags or [],
-            'dependencies': task.dependencies or [],
-            'progress_percentage': task.progress_percentage,
-            'parent_task_id': task.parent_task_id,
-            'created_at': task.created_at.isoformat()
-        })
+        return jsonify(task_data)
     except Exception as e:
         db.session.rollback()
         logger.error(f"Error creating task: {str(e)}")
         return jsonify({'error': 'Failed to create task'}), 500
 
+@app.route('/api/tasks/changes', methods=['GET'])
+@login_required
+def task_changes():
+    """Tasks created or updated and ids deleted since a change cursor (?since=&format=normalized)"""
+    try:
+        since = parse_change_cursor(request.args.get('since', ''))
+    except ValueError:
+        return jsonify({'error': 'since must be a change cursor from GET /api/tasks or a previous sync'}), 400
+    normalized = request.args.get('format') == 'normalized'
+
+    cursor, tasks, deleted_ids = get_task_changes(current_user.id, since)
+    lookups = load_task_lookups(current_user.id, tasks)
+    payload = {'tasks': serialize_tasks(tasks, lookups, normalized=normalized), 'deleted': deleted_ids,
+               'cursor': cursor}
+    if normalized:
+        payload.update(normalize_task_lookups(lookups))
+    return jsonify(payload)
+
 @app.route('/api/tasks/<int:task_id>', methods=['PUT', 'DELETE'])
 @login_required
+@invalidates_user_data
 def task_operations(task_id):
     task = Task.query.filter_by(id=task_id, user_id=current_user.id).first_or_404()
 
     if request.method == 'DELETE':
+        affected_dates = get_scheduled_dates([task.id])
+        apply_estimation_change(current_user.id, task_estimation_sample(task), None)
+        remove_task_documents([task.id])
+        mark_tasks_changed(current_user.id, deleted_task_ids=[task.id])
+        apply_productive_hour_changes(current_user.id, count_completed_blocks_by_hour(
+            current_user.id, task_ids=[task.id]
+        ), {})
         db.session.delete(task)
+        db.session.flush()
+        refresh_daily_rollups(current_user.id, affected_dates)
         db.session.commit()
         return '', 204
 
     data = request.json
+    previous_category_id = task.category_id
+    previous_parent_task_id = task.parent_task_id
+    previous_estimation_sample = task_estimation_sample(task)
+    was_completed = task.completed
     
     # Update basic fields
     task.title = data.get('title', task.title)
     task.description = data.get('description', task.description)
-    task.category_id = data.get('category_id', task.category_id)
+    task.category_id = int(data.get('category_id', task.category_id))
     
     # Update enhanced tracking fields
     if 'due_date' in data:
-        task.due_date = datetime.fromisoformat(data['due_date'].replace('Z', '+00:00')) if data['due_date'] else None
+        task.due_date = parse_due_date(data['due_date']) if data['due_date'] else None
     
     task.status = data.get('status', task.status)
-    task.role_id = data.get('role_id', task.role_id)
+    task.role_id = optional_int(data.get('role_id', task.role_id))
     task.is_recurring = data.get('is_recurring', task.is_recurring)
     task.recurrence_rule = data.get('recurrence_rule', task.recurrence_rule)
     task.priority = data.get('priority', task.priority)
@@ -603,7 +709,7 @@ def task_operations(task_id):
     task.tags = data.get('tags', task.tags)
     task.dependencies = data.get('dependencies', task.dependencies)
     task.progress_percentage = data.get('progress_percentage', task.progress_percentage)
-    task.parent_task_id = data.get('parent_task_id', task.parent_task_id)
+    task.parent_task_id = optional_int(data.get('parent_task_id', task.parent_task_id))
     
     # Handle completion status
     if 'completed' in data:
@@ -619,54 +725,43 @@ def task_operations(task_id):
     # Update last worked on timestamp if task is being modified
     task.last_worked_on = datetime.utcnow()
     
+    # Moving a task to another category shifts its scheduled minutes between rollup rows
+    if str(task.category_id) != str(previous_category_id):
+        refresh_daily_rollups(current_user.id, get_scheduled_dates([task.id]))
+    
+    # Completing, re-estimating or recategorizing a task moves its actual/estimated ratio
+    apply_estimation_change(current_user.id, previous_estimation_sample, task_estimation_sample(task))
+    apply_task_completion_hours(current_user.id, task.id, was_completed, task.completed)
+    
+    db.session.flush()
+    index_task(task)
+    mark_tasks_changed(current_user.id, [task.id, previous_parent_task_id])
+    task_data = serialize_task(task, load_task_lookups(current_user.id, [task]))
     db.session.commit()
     
-    return jsonify({
-        'id': task.id,
-        'title': task.title,
-        'description': task.description,
-        'category_id': task.category_id,
-        'category_name': task.category.name,
-        'category_color': task.category.color,
-        'due_date': task.due_date.isoformat() if task.due_date else None,
-        'status': task.status,
-        'status_color': task.get_status_color(),
-        'role_id': task.role_id,
-        'role_name': task.assigned_role.name if task.assigned_role else None,
-        'is_recurring': task.is_recurring,
-        'recurrence_rule': task.recurrence_rule,
-        'priority': task.priority,
-        'priority_color': task.get_priority_color(),
-        'completed': task.completed,
-        'completed_at': task.completed_at.isoformat() if task.completed_at else None,
-        'estimated_minutes': task.estimated_minutes,
-        'actual_minutes': task.actual_minutes,
-        'total_time_spent': task.get_total_time_spent(),
-        'notes': task.notes,
-        'tags': task.tags or [],
-        'dependencies': task.dependencies or [],
-        'progress_percentage': task.progress_percentage,
-        'last_worked_on': task.last_worked_on.isoformat() if task.last_worked_on else None,
-        'parent_task_id': task.parent_task_id,
-        'subtask_count': len(task.subtasks),
-        'is_overdue': task.is_overdue(),
-        'created_at': task.created_at.isoformat()
-    })
+    return jsonify(task_data)
 
 # Role Management API Endpoints
 @app.route('/api/roles', methods=['GET', 'POST'])
 @login_required
+@invalidates_user_data
 def manage_roles():
     if request.method == 'GET':
-        roles = Role.query.filter_by(user_id=current_user.id).order_by(Role.created_at.desc()).all()
+        # Task counts come from one grouped subquery instead of loading each role's tasks
+        task_counts = db.session.query(
+            Task.role_id, func.count(Task.id).label('task_count')
+        ).filter(Task.user_id == current_user.id).group_by(Task.role_id).subquery()
+        roles = db.session.query(Role, func.coalesce(task_counts.c.task_count, 0)).outerjoin(
+            task_counts, task_counts.c.role_id == Role.id
+        ).filter(Role.user_id == current_user.id).order_by(Role.created_at.desc()).all()
         return jsonify([{
             'id': role.id,
             'name': role.name,
             'color': role.color,
             'description': role.description,
-            'task_count': len(role.tasks),
+            'task_count': task_count,
             'created_at': role.created_at.isoformat()
-        } for role in roles])
+        } for role, task_count in roles])
     
     data = request.json
     if not data.get('name'):
@@ -697,20 +792,30 @@ def manage_roles():
 
 @app.route('/api/roles/<int:role_id>', methods=['PUT', 'DELETE'])
 @login_required
+@invalidates_user_data
 def role_operations(role_id):
     role = Role.query.filter_by(id=role_id, user_id=current_user.id).first_or_404()
     
     if request.method == 'DELETE':
         # Update tasks to remove role assignment before deleting role
+        mark_tasks_changed(current_user.id, [task_id for (task_id,) in db.session.query(Task.id).filter_by(
+            role_id=role.id
+        ).all()])
         Task.query.filter_by(role_id=role.id).update({'role_id': None})
         db.session.delete(role)
         db.session.commit()
         return '', 204
     
     data = request.json
+    previous_role_name = role.name
     role.name = data.get('name', role.name)
     role.color = data.get('color', role.color)
     role.description = data.get('description', role.description)
+    # Tasks carry their role's name, so a rename reaches clients as task changes
+    if role.name != previous_role_name:
+        mark_tasks_changed(current_user.id, [task_id for (task_id,) in db.session.query(Task.id).filter_by(
+            role_id=role.id
+        ).all()])
     db.session.commit()
     
     return jsonify({
@@ -718,40 +823,49 @@ def role_operations(role_id):
         'name': role.name,
         'color': role.color,
         'description': role.description,
-        'task_count': len(role.tasks),
+        'task_count': Task.query.filter_by(role_id=role.id).count(),
         'created_at': role.created_at.isoformat()
     })
 
+@app.route('/api/roles/analytics', methods=['GET'])
+@login_required
+@cached_user_data('role_analytics')
+@statement_timeout()
+def get_role_analytics_data():
+    """Task counts and time spent per role over the last ?days= days"""
+    try:
+        days = parse_range_days(request.args.get('days'), 30)
+    except RangeLimitError as e:
+        return jsonify({'error': str(e)}), 400
+
+    end_date = datetime.now(pacific_tz).date()
+    start_date = end_date - timedelta(days=days - 1)
+    return jsonify(get_role_analytics(current_user.id, start_date, end_date))
+
 # Task Analytics and Reporting Endpoints
 @app.route('/api/tasks/analytics')
 @login_required
 def task_analytics():
     """Get task analytics and statistics"""
-    tasks = Task.query.filter_by(user_id=current_user.id).all()
-    
-    analytics = {
-        'total_tasks': len(tasks),
-        'completed_tasks': len([t for t in tasks if t.completed]),
-        'pending_tasks': len([t for t in tasks if t.status == 'pending']),
-        'in_progress_tasks': len([t for t in tasks if t.status == 'in_progress']),
-        'blocked_tasks': len([t for t in tasks if t.status == 'blocked']),
-        'overdue_tasks': len([t for t in tasks if t.is_overdue()]),
-        'priority_breakdown': {
-            'urgent': len([t for t in tasks if t.priority == 'urgent']),
-            'high': len([t for t in tasks if t.priority == 'high']),
-            'medium': len([t for t in tasks if t.priority == 'medium']),
-            'low': len([t for t in tasks if t.priority == 'low'])
-        },
-        'total_estimated_hours': sum([t.estimated_minutes or 0 for t in tasks]) / 60,
-        'total_actual_hours': sum([t.actual_minutes or 0 for t in tasks]) / 60,
-        'total_tracked_hours': sum([t.get_total_time_spent() for t in tasks]) / 60,
-        'completion_rate': (len([t for t in tasks if t.completed]) / len(tasks) * 100) if tasks else 0
-    }
-    
-    return jsonify(analytics)
+    # Not cached: overdue_tasks moves with the clock, and the summary is one aggregate query anyway
+    return jsonify(get_task_summary(current_user.id))
+
+@app.route('/api/tasks/estimate', methods=['GET'])
+@login_required
+def estimate_task_duration():
+    """Expected actual minutes for an estimate, based on the category's past estimation accuracy"""
+    try:
+        estimated_minutes = int(request.args.get('estimated_minutes', ''))
+    except ValueError:
+        return jsonify({'error': 'estimated_minutes must be a whole number'}), 400
+    if estimated_minutes <= 0:
+        return jsonify({'error': 'estimated_minutes must be positive'}), 400
+    category_id = request.args.get('category_id', type=int)
+    return jsonify(get_expected_actual_minutes(current_user.id, category_id, estimated_minutes))
 
 @app.route('/api/tasks/<int:task_id>/comments', methods=['GET', 'POST'])
 @login_required
+@invalidates_user_data
 def task_comments(task_id):
     task = Task.query.filter_by(id=task_id, user_id=current_user.id).first_or_404()
     
@@ -774,6 +888,8 @@ def task_comments(task_id):
             content=data['content']
         )
         db.session.add(comment)
+        db.session.flush()
+        index_comment(comment)
         db.session.commit()
         
         return jsonify({
@@ -786,8 +902,30 @@ def task_comments(task_id):
         logger.error(f"Error creating comment: {str(e)}")
         return jsonify({'error': 'Failed to create comment'}), 500
 
+@app.route('/api/search', methods=['GET'])
+@login_required
+@cached_user_data('search')
+@statement_timeout()
+def search():
+    """Ranked full-text search over tasks, comments and daily plans (?q=&type=&page=&per_page=)"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'q is required'}), 400
+    doc_types = [doc_type for doc_type in request.args.get('type', '').split(',') if doc_type]
+    if any(doc_type not in DOC_TYPES for doc_type in doc_types):
+        return jsonify({'error': f"type must be one of: {', '.join(DOC_TYPES)}"}), 400
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 20, type=int)
+    if page < 1 or not 1 <= per_page <= 50:
+        return jsonify({'error': 'page must be positive and per_page between 1 and 50'}), 400
+
+    results, has_more = search_documents(current_user.id, query, limit=per_page,
+                                         offset=(page - 1) * per_page, doc_types=doc_types)
+    return jsonify({'results': results, 'page': page, 'per_page': per_page, 'has_more': has_more})
+
 @app.route('/api/tasks/<int:task_id>/progress', methods=['PUT'])
 @login_required
+@invalidates_user_data
 def update_task_progress(task_id):
     task = Task.query.filter_by(id=task_id, user_id=current_user.id).first_or_404()
     
@@ -799,6 +937,8 @@ def update_task_progress(task_id):
     
     task.progress_percentage = progress
     task.last_worked_on = datetime.utcnow()
+    previous_estimation_sample = task_estimation_sample(task)
+    was_completed = task.completed
     
     # Auto-update status based on progress
     if progress == 0:
@@ -810,6 +950,9 @@ def update_task_progress(task_id):
     elif progress > 0:
         task.status = 'in_progress'
     
+    apply_estimation_change(current_user.id, previous_estimation_sample, task_estimation_sample(task))
+    apply_task_completion_hours(current_user.id, task.id, was_completed, task.completed)
+    mark_tasks_changed(current_user.id, [task.id])
     db.session.commit()
     
     return jsonify({
@@ -901,6 +1044,7 @@ def restore_today_plan():
 
 @app.route('/api/daily-plan', methods=['POST'])
 @login_required
+@invalidates_user_data
 def save_daily_plan():
     """Update user's daily plan with conflict detection."""
     data = request.json
@@ -958,16 +1102,11 @@ def save_daily_plan():
 
     # Handle time blocks - only update if explicitly provided with data
     if data.get('time_blocks'):
+        # Blocks may only point at the user's own tasks; any other task id is saved unassigned
+        tasks_by_id = load_block_tasks(current_user.id, data['time_blocks'])
+        blocks_before = get_plan_task_minutes(daily_plan.id)
+        hours_before = get_plan_hour_counts(current_user.id, daily_plan.id)
         TimeBlock.query.filter_by(daily_plan_id=daily_plan.id).delete()
-        assigned_task_ids = {
-            block_data.get('task_id')
-            for block_data in data.get('time_blocks', [])
-            if block_data.get('task_id')
-        }
-        tasks_by_id = {}
-        if assigned_task_ids:
-            tasks = Task.query.filter(Task.id.in_(assigned_task_ids)).all()
-            tasks_by_id = {task.id: task for task in tasks}
 
         for block_data in data.get('time_blocks', []):
             # Validate that both start_time and end_time exist
@@ -976,28 +1115,38 @@ def save_daily_plan():
                 continue
                 
             try:
+                task = tasks_by_id.get(block_task_id(block_data))
+                if task is None and block_task_id(block_data) is not None:
+                    logger.warning(f"Unassigning time block from unknown task {block_data.get('task_id')}")
                 time_block = TimeBlock(
                     daily_plan_id=daily_plan.id,
                     start_time=datetime.strptime(block_data['start_time'], '%H:%M').time(),
                     end_time=datetime.strptime(block_data['end_time'], '%H:%M').time(),
-                    task_id=block_data.get('task_id'),
+                    task_id=task.id if task else None,
                     completed=block_data.get('completed', False),
                     notes=block_data.get('notes', '')[:15]  # Ensure notes don't exceed 15 chars
                 )
                 db.session.add(time_block)
                 
                 # Update task usage statistics when a task is assigned to a time block
-                if block_data.get('task_id'):
-                    task = tasks_by_id.get(block_data['task_id'])
-                    if task:
-                        task.usage_count = (task.usage_count or 0) + 1
-                        task.last_used = datetime.utcnow()
+                if task:
+                    task.usage_count = (task.usage_count or 0) + 1
+                    task.last_used = datetime.utcnow()
             except (ValueError, KeyError) as e:
                 logger.error(f"Error processing time block {block_data}: {str(e)}")
                 continue
 
+        # Keep the per-task time counters and the hour histogram in step with the rewritten blocks
+        mark_tasks_changed(current_user.id, apply_task_minute_changes(
+            current_user.id, blocks_before, get_plan_task_minutes(daily_plan.id)
+        ))
+        apply_productive_hour_changes(current_user.id, hours_before,
+                                      get_plan_hour_counts(current_user.id, daily_plan.id))
+
 
     try:
+        refresh_daily_rollups(current_user.id, [date])
+        index_daily_plan(daily_plan)
         db.session.commit()
         last_saved = datetime.now(pacific_tz).strftime('%Y-%m-%d %H:%M:%S')
         return jsonify({'status': 'success', 'last_saved': last_saved})
@@ -1006,143 +1155,183 @@ def save_daily_plan():
         logger.error(f"Error saving daily plan: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+# Tasks rendered with the summary page; the rest load on demand via /api/summary/tasks
+SUMMARY_TASK_PAGE_SIZE = 10
+
+def get_summary_range(period):
+    """(start_date, end_date, days) for a parsed summary period: a number of days or 'all'"""
+    end_date = datetime.now(pacific_tz).date()
+    if period == 'all':
+        first_date = db.session.query(func.min(DailyCategoryRollup.date)).filter(
+            DailyCategoryRollup.user_id == current_user.id
+        ).scalar()
+        start_date = min(first_date or end_date, end_date)
+        days = (end_date - start_date).days + 1
+    else:
+        days = period
+        start_date = end_date - timedelta(days=days-1)
+    return start_date, end_date, days
+
+def get_summary_task_page(period, start_date, end_date, days, after=None, limit=SUMMARY_TASK_PAGE_SIZE):
+    """One page of the summary task leaderboard, using the precomputed window when there is one"""
+    task_minutes = None
+    if period != 'all' and days in PRECOMPUTED_WINDOWS:
+        task_minutes = {
+            task_id: planned
+            for task_id, (planned, _) in get_window_totals(current_user.id, days, end_date)['tasks'].items()
+        }
+    return get_task_leaderboard(current_user.id, start_date, end_date, limit, after, task_minutes)
+
 @app.route('/summary')
 @login_required
+@cached_user_data('summary')
+@statement_timeout()
 def summary():
-    # Get the date range parameters
-    period = request.args.get('period', '7')  # Default to 7 days
-    days = int(period)
-    end_date = datetime.now(pacific_tz).date()
-    start_date = end_date - timedelta(days=days-1)
-
-    # Query for all daily plans in the date range
-    daily_plans = DailyPlan.query.filter(
-        DailyPlan.user_id == current_user.id,
-        DailyPlan.date >= start_date,
-        DailyPlan.date <= end_date
-    ).all()
+    # Get the date range parameters; out-of-range periods are clamped rather than rejected
+    period = parse_range_days(request.args.get('period'), 7, allow_all=True, clamp=True)  # Default to 7 days
+    start_date, end_date, days = get_summary_range(period)
 
     # Initialize statistics dictionaries
     category_stats = {}
     task_stats = {}
-    daily_category_breakdown = {}
     total_minutes = 0
+    daily_breakdown_list = []
+    weekly_breakdown_list = []
+    breakdown_label = 'Weekly'
+
+    categories = {c.id: c for c in Category.query.filter_by(user_id=current_user.id).all()}
+
+    def add_category_minutes(category_id, minutes, active_days):
+        category = categories.get(category_id)
+        if category_id not in category_stats:
+            category_stats[category_id] = {
+                'name': category.name,
+                'color': category.color,
+                'minutes': 0,
+                'days_used': 0
+            }
+        category_stats[category_id]['minutes'] += minutes
+        category_stats[category_id]['days_used'] += active_days
+
+    if days <= 30:
+        # Short periods show every day, read straight from the daily rollups
+        daily_category_breakdown = {}
+        rollup_rows = db.session.query(
+            DailyCategoryRollup.date,
+            DailyCategoryRollup.category_id,
+            DailyCategoryRollup.planned_minutes
+        ).filter(
+            DailyCategoryRollup.user_id == current_user.id,
+            DailyCategoryRollup.date.between(start_date, end_date),
+            DailyCategoryRollup.planned_minutes > 0
+        ).order_by(DailyCategoryRollup.planned_minutes.desc()).all()
+
+        for plan_date, category_id, minutes in rollup_rows:
+            if category_id not in categories:
+                continue
+            total_minutes += minutes
+            add_category_minutes(category_id, minutes, 1)
+            daily_category_breakdown.setdefault(plan_date, {})[category_id] = {
+                'name': categories[category_id].name,
+                'color': categories[category_id].color,
+                'minutes': minutes
+            }
 
-    # Get all dates in range for consistent daily breakdown
-    all_dates = []
-    current_date = start_date
-    while current_date <= end_date:
-        all_dates.append(current_date)
-        current_date += timedelta(days=1)
-
-    # Calculate statistics
-    for plan in daily_plans:
-        plan_date = plan.date
-        if plan_date not in daily_category_breakdown:
-            daily_category_breakdown[plan_date] = {}
-            
-        for block in plan.time_blocks:
-            if block.task_id:
-                task = Task.query.get(block.task_id)
-                if task:
-                    # Each block is 15 minutes
-                    minutes = 15
-                    total_minutes += minutes
-
-                    # Update task statistics
-                    if task.id not in task_stats:
-                        task_stats[task.id] = {
-                            'title': task.title,
-                            'minutes': 0,
-                            'category_id': task.category_id,
-                            'category_name': task.category.name,
-                            'category_color': task.category.color
-                        }
-                    task_stats[task.id]['minutes'] += minutes
-
-                    # Update category statistics
-                    if task.category_id not in category_stats:
-                        category_stats[task.category_id] = {
-                            'name': task.category.name,
-                            'color': task.category.color,
-                            'minutes': 0,
-                            'days_used': set()
-                        }
-                    category_stats[task.category_id]['minutes'] += minutes
-                    category_stats[task.category_id]['days_used'].add(plan.date)
+        # Prepare daily breakdown for template (most recent first)
+        for offset in range(days):
+            date = end_date - timedelta(days=offset)
+            day_categories = daily_category_breakdown.get(date, {})
+            daily_breakdown_list.append({
+                'date': date,
+                'categories': day_categories,
+                'total_minutes': sum(cat['minutes'] for cat in day_categories.values())
+            })
+    else:
+        # Longer periods aggregate by week (or by month beyond a year) from the rollup tiers,
+        # so only a few rows per period are read however long the range is
+        rollup_period = 'week' if days <= 366 else 'month'
+        breakdown_label = 'Weekly' if rollup_period == 'week' else 'Monthly'
+        breakdown = get_period_breakdown(current_user.id, start_date, end_date, rollup_period)
+
+        period_starts = []
+        period_start = get_period_start(start_date, rollup_period)
+        while period_start <= end_date:
+            period_starts.append(period_start)
+            period_start = get_period_end(period_start, rollup_period) + timedelta(days=1)
+
+        for period_start in reversed(period_starts):
+            period_categories = {}
+            for category_id, totals in sorted(breakdown.get(period_start, {}).items(),
+                                              key=lambda item: item[1]['planned_minutes'], reverse=True):
+                if category_id not in categories or not totals['planned_minutes']:
+                    continue
+                minutes = totals['planned_minutes']
+                total_minutes += minutes
+                add_category_minutes(category_id, minutes, totals['active_days'])
+                period_categories[category_id] = {
+                    'name': categories[category_id].name,
+                    'color': categories[category_id].color,
+                    'minutes': minutes
+                }
+            weekly_breakdown_list.append({
+                'week_start': period_start,
+                'week_end': get_period_end(period_start, rollup_period),
+                'categories': period_categories,
+                'total_minutes': sum(cat['minutes'] for cat in period_categories.values())
+            })
 
-                    # Update daily category breakdown
-                    if task.category_id not in daily_category_breakdown[plan_date]:
-                        daily_category_breakdown[plan_date][task.category_id] = {
-                            'name': task.category.name,
-                            'color': task.category.color,
-                            'minutes': 0
-                        }
-                    daily_category_breakdown[plan_date][task.category_id]['minutes'] += minutes
+    # Only the top tasks are rendered; "show more" pages through the rest by keyset
+    task_rows, task_cursor = get_summary_task_page(period, start_date, end_date, days)
+    for row in task_rows:
+        task_stats[row['id']] = row
 
     # Calculate average daily/weekly/monthly hours for categories
+    category_stats = dict(sorted(category_stats.items(), key=lambda item: item[1]['minutes'], reverse=True))
     num_weeks = max(days / 7, 1)
     num_months = max(days / 30, 1)
     for cat_stats in category_stats.values():
-        days_used = len(cat_stats['days_used'])
+        days_used = cat_stats.pop('days_used')
         cat_stats['avg_daily_minutes'] = cat_stats['minutes'] / (days_used if days_used > 0 else 1)
         cat_stats['avg_weekly_minutes'] = cat_stats['minutes'] / num_weeks
         cat_stats['avg_monthly_minutes'] = cat_stats['minutes'] / num_months
-        del cat_stats['days_used']  # Remove set before passing to template
 
     avg_weekly_total = total_minutes / num_weeks
     avg_monthly_total = total_minutes / num_months
 
-    # Prepare daily breakdown for template (convert to list format)
-    daily_breakdown_list = []
-    for date in sorted(all_dates, reverse=True):  # Most recent first
-        day_data = {
-            'date': date,
-            'categories': daily_category_breakdown.get(date, {}),
-            'total_minutes': sum(cat['minutes'] for cat in daily_category_breakdown.get(date, {}).values())
-        }
-        daily_breakdown_list.append(day_data)
-
-    # For longer periods, aggregate by week
-    weekly_breakdown_list = []
-    if days > 30:
-        from collections import OrderedDict
-        weekly_data = OrderedDict()
-        for date in sorted(all_dates):
-            week_start = date - timedelta(days=date.weekday())
-            if week_start not in weekly_data:
-                weekly_data[week_start] = {'categories': {}, 'total_minutes': 0}
-            day_cats = daily_category_breakdown.get(date, {})
-            for cat_id, cat_info in day_cats.items():
-                if cat_id not in weekly_data[week_start]['categories']:
-                    weekly_data[week_start]['categories'][cat_id] = {
-                        'name': cat_info['name'],
-                        'color': cat_info['color'],
-                        'minutes': 0
-                    }
-                weekly_data[week_start]['categories'][cat_id]['minutes'] += cat_info['minutes']
-                weekly_data[week_start]['total_minutes'] += cat_info['minutes']
-        for week_start in sorted(weekly_data.keys(), reverse=True):
-            week_end = week_start + timedelta(days=6)
-            weekly_breakdown_list.append({
-                'week_start': week_start,
-                'week_end': week_end,
-                'categories': weekly_data[week_start]['categories'],
-                'total_minutes': weekly_data[week_start]['total_minutes']
-            })
-
     return render_template('summary.html',
                          days=days,
+                         period=period,
                          start_date=start_date,
                          end_date=end_date,
                          category_stats=category_stats,
                          task_stats=task_stats,
+                         task_cursor=task_cursor,
                          total_minutes=total_minutes,
                          avg_weekly_total=avg_weekly_total,
                          avg_monthly_total=avg_monthly_total,
                          daily_breakdown=daily_breakdown_list,
-                         weekly_breakdown=weekly_breakdown_list)
+                         weekly_breakdown=weekly_breakdown_list,
+                         breakdown_label=breakdown_label)
 
+@app.route('/api/summary/tasks', methods=['GET'])
+@login_required
+@statement_timeout()
+def summary_tasks():
+    """Next page of the summary task leaderboard (?period=&after=<cursor>&limit=)"""
+    limit = request.args.get('limit', SUMMARY_TASK_PAGE_SIZE, type=int)
+    if not 1 <= limit <= 100:
+        return jsonify({'error': 'limit must be between 1 and 100'}), 400
+    try:
+        period = parse_range_days(request.args.get('period'), 7, allow_all=True)
+    except RangeLimitError as e:
+        return jsonify({'error': str(e)}), 400
+    start_date, end_date, days = get_summary_range(period)
+    try:
+        tasks, next_cursor = get_summary_task_page(period, start_date, end_date, days,
+                                                   request.args.get('after'), limit)
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    return jsonify({'tasks': tasks, 'next_cursor': next_cursor})
 
 
 @app.route('/health')
@@ -1249,6 +1438,7 @@ def delete_template(template_id):
 
 @app.route('/api/apply-template', methods=['POST'])
 @login_required
+@invalidates_user_data
 def apply_template():
     """Apply a saved template to a selected date."""
     data = request.json
@@ -1279,7 +1469,12 @@ def apply_template():
         daily_plan = DailyPlan(user_id=current_user.id, date=date)
         db.session.add(daily_plan)
 
+    # Template blocks may name tasks that were deleted since; those are applied unassigned
+    tasks_by_id = load_block_tasks(current_user.id, template.time_blocks or [])
+
     # Clear existing priorities and time blocks
+    blocks_before = get_plan_task_minutes(daily_plan.id)
+    hours_before = get_plan_hour_counts(current_user.id, daily_plan.id)
     Priority.query.filter_by(daily_plan_id=daily_plan.id).delete()
     TimeBlock.query.filter_by(daily_plan_id=daily_plan.id).delete()
 
@@ -1301,13 +1496,20 @@ def apply_template():
                 daily_plan_id=daily_plan.id,
                 start_time=datetime.strptime(block_data['start_time'], '%H:%M').time(),
                 end_time=datetime.strptime(block_data['end_time'], '%H:%M').time(),
-                task_id=block_data.get('task_id'),
+                task_id=block_task_id(block_data) if block_task_id(block_data) in tasks_by_id else None,
                 completed=False,  # Start fresh with uncompleted blocks
                 notes=block_data.get('notes', '')[:15]  # Maintain the 15-char limit
             )
             db.session.add(time_block)
 
     try:
+        mark_tasks_changed(current_user.id, apply_task_minute_changes(
+            current_user.id, blocks_before, get_plan_task_minutes(daily_plan.id)
+        ))
+        # Template blocks start uncompleted, so the plan's old completions simply drop out
+        apply_productive_hour_changes(current_user.id, hours_before, {})
+        refresh_daily_rollups(current_user.id, [date])
+        index_daily_plan(daily_plan)
         db.session.commit()
         return jsonify({'message': 'Template applied successfully'}), 200
     except Exception as e:
@@ -1389,6 +1591,7 @@ def time_preferences():
 
 @app.route('/api/seven-day-stats', methods=['GET'])
 @login_required
+@cached_user_data('seven_day_stats')
 def get_seven_day_stats():
     """Get 7-day time statistics for the current user, ending on the specified date."""
     try:
@@ -1402,56 +1605,42 @@ def get_seven_day_stats():
         # Calculate date range for the 7 days ending on end_date
         start_date = end_date - timedelta(days=6)
         
-        # Query for all daily plans in the date range
-        daily_plans = DailyPlan.query.filter(
-            DailyPlan.user_id == current_user.id,
-            DailyPlan.date >= start_date,
-            DailyPlan.date <= end_date
-        ).all()
+        # Per-category totals come from the daily rollups rather than raw time blocks
+        rollup_totals = get_category_rollup_totals(current_user.id, start_date, end_date)
+        categories = {c.id: c for c in Category.query.filter_by(user_id=current_user.id).all()}
         
-        # Initialize statistics
-        total_minutes = 0
-        aps_minutes = 0
+        # PTO hours count toward the Work category
+        pto_minutes = rollup_totals.pop(None, {}).get('pto_minutes', 0)
+        total_minutes = pto_minutes
+        aps_minutes = pto_minutes
         category_stats = {}
+        if pto_minutes > 0:
+            work_category = next((c for c in categories.values() if c.name == 'Work'), None)
+            category_stats['Work'] = {
+                'name': 'Work',
+                'color': work_category.color if work_category else '#007bff',  # Default blue color for Work
+                'minutes': pto_minutes
+            }
         
-        # Calculate statistics from time blocks and PTO hours
-        for plan in daily_plans:
-            # Add PTO hours to Work category if any exist
-            if plan.pto_hours and plan.pto_hours > 0:
-                pto_minutes = plan.pto_hours * 60
-                total_minutes += pto_minutes
-                aps_minutes += pto_minutes  # PTO counts toward Work hours
-                
-                # Add to Work category stats
-                if 'Work' not in category_stats:
-                    category_stats['Work'] = {
-                        'name': 'Work',
-                        'color': '#007bff',  # Default blue color for Work
-                        'minutes': 0
-                    }
-                category_stats['Work']['minutes'] += pto_minutes
+        for category_id, totals in rollup_totals.items():
+            category = categories.get(category_id)
+            if not category:
+                continue
+            minutes = totals['planned_minutes']
+            total_minutes += minutes
+            
+            # Check if this is APS/Work category
+            if category.name.lower() in ['aps', 'work']:
+                aps_minutes += minutes
             
-            for block in plan.time_blocks:
-                if block.task_id:
-                    task = Task.query.get(block.task_id)
-                    if task and task.category:
-                        # Each block is 15 minutes
-                        minutes = 15
-                        total_minutes += minutes
-                        
-                        # Check if this is APS/Work category
-                        if task.category.name.lower() in ['aps', 'work']:
-                            aps_minutes += minutes
-                        
-                        # Update category statistics
-                        category_name = task.category.name
-                        if category_name not in category_stats:
-                            category_stats[category_name] = {
-                                'name': category_name,
-                                'color': task.category.color,
-                                'minutes': 0
-                            }
-                        category_stats[category_name]['minutes'] += minutes
+            if category.name not in category_stats:
+                category_stats[category.name] = {
+                    'name': category.name,
+                    'color': category.color,
+                    'minutes': 0
+                }
+            category_stats[category.name]['color'] = category.color
+            category_stats[category.name]['minutes'] += minutes
         
         # Calculate progress percentage for Work goal (32 hours = 1920 minutes)
         work_goal_minutes = 32 * 60  # 32 hours in minutes
@@ -1462,7 +1651,11 @@ def get_seven_day_stats():
             'total_hours': round(total_minutes / 60, 1),
             'work_hours': round(aps_minutes / 60, 1),  # Changed from aps_hours to work_hours
             'work_progress_percentage': round(aps_progress_percentage, 1),  # Changed from aps_progress_percentage
-            'category_stats': list(category_stats.values()),
+            'category_stats': sorted(
+                # PTO minutes can be fractional; every category reports whole minutes
+                [dict(stats, minutes=int(round(stats['minutes']))) for stats in category_stats.values()],
+                key=lambda stats: stats['minutes'], reverse=True
+            ),
             'date_range': {
                 'start': start_date.strftime('%Y-%m-%d'),
                 'end': end_date.strftime('%Y-%m-%d')
@@ -1478,6 +1671,7 @@ def get_seven_day_stats():
 
 @app.route('/api/time-preferences', methods=['POST'])
 @login_required
+@invalidates_user_data
 def update_time_preferences():
     """Update user's time preferences."""
     data = request.json
@@ -1519,22 +1713,30 @@ def update_time_preferences():
 # Enhanced Time Tracking Analytics
 @app.route('/api/time-analytics', methods=['GET'])
 @login_required
+@cached_user_data('time_analytics')
+@statement_timeout()
 def get_time_analytics():
     """Get comprehensive time tracking analytics"""
-    # Get date range from request
-    days = int(request.args.get('days', 30))
-    end_date = datetime.now(pacific_tz).date()
-    start_date = end_date - timedelta(days=days)
+    # Get date range from request; this loads individual blocks, so check the cost first
+    try:
+        days = parse_range_days(request.args.get('days'), 30)
+        end_date = datetime.now(pacific_tz).date()
+        start_date = end_date - timedelta(days=days)
+        check_range_cost(current_user.id, start_date, end_date)
+    except RangeLimitError as e:
+        return jsonify({'error': str(e)}), 400
     
-    # Query daily plans in range
-    daily_plans = DailyPlan.query.filter(
+    # Completed blocks in range as typed columns; every rollup below is vectorized
+    cols = load_block_columns(current_user.id, start_date, end_date, completed_only=True)
+    categories = {c.id: c for c in Category.query.filter_by(user_id=current_user.id).all()}
+    plan_dates = [plan_date for (plan_date,) in db.session.query(DailyPlan.date).filter(
         DailyPlan.user_id == current_user.id,
         DailyPlan.date >= start_date,
         DailyPlan.date <= end_date
-    ).all()
+    ).all()]
     
     analytics = {
-        'total_hours': 0,
+        'total_hours': cols.day.size * BLOCK_MINUTES / 60,
         'productive_hours': 0,
         'category_breakdown': {},
         'daily_patterns': {},
@@ -1544,45 +1746,38 @@ def get_time_analytics():
         'time_distribution': {}
     }
     
-    # Calculate analytics
-    for plan in daily_plans:
-        day_total = 0
-        for block in plan.time_blocks:
-            if block.task_id and block.completed:
-                minutes = 15
-                analytics['total_hours'] += minutes / 60
-                day_total += minutes / 60
-                
-                # Get task and category info
-                task = Task.query.get(block.task_id)
-                if task:
-                    category_name = task.category.name
-                    
-                    # Category breakdown
-                    if category_name not in analytics['category_breakdown']:
-                        analytics['category_breakdown'][category_name] = {
-                            'hours': 0,
-                            'color': task.category.color,
-                            'completion_rate': 0,
-                            'total_blocks': 0,
-                            'completed_blocks': 0
-                        }
-                    
-                    analytics['category_breakdown'][category_name]['hours'] += minutes / 60
-                    analytics['category_breakdown'][category_name]['total_blocks'] += 1
-                    analytics['category_breakdown'][category_name]['completed_blocks'] += 1
-                    
-                    # Hourly productivity
-                    hour = block.start_time.hour
-                    if hour not in analytics['most_productive_hours']:
-                        analytics['most_productive_hours'][hour] = 0
-                    analytics['most_productive_hours'][hour] += 1
-        
-        # Daily patterns
-        day_name = plan.date.strftime('%A')
+    # Category breakdown
+    for category_id, (planned_minutes, completed_minutes) in category_rollup(cols).items():
+        category = categories.get(category_id)
+        if not category:
+            continue
+        if category.name not in analytics['category_breakdown']:
+            analytics['category_breakdown'][category.name] = {
+                'hours': 0,
+                'color': category.color,
+                'completion_rate': 0,
+                'total_blocks': 0,
+                'completed_blocks': 0
+            }
+        breakdown = analytics['category_breakdown'][category.name]
+        breakdown['hours'] += completed_minutes / 60
+        breakdown['total_blocks'] += planned_minutes // BLOCK_MINUTES
+        breakdown['completed_blocks'] += completed_minutes // BLOCK_MINUTES
+    
+    # Hourly productivity
+    _, completed_by_hour = hour_rollup(cols)
+    analytics['most_productive_hours'] = {
+        hour: int(minutes) // BLOCK_MINUTES
+        for hour, minutes in enumerate(completed_by_hour) if minutes
+    }
+    
+    # Daily patterns
+    _, completed_by_day = day_rollup(cols)
+    for plan_date in plan_dates:
+        day_name = plan_date.strftime('%A')
         if day_name not in analytics['daily_patterns']:
             analytics['daily_patterns'][day_name] = {'total_hours': 0, 'days_counted': 0}
-        analytics['daily_patterns'][day_name]['total_hours'] += day_total
+        analytics['daily_patterns'][day_name]['total_hours'] += int(completed_by_day[(plan_date - start_date).days]) / 60
         analytics['daily_patterns'][day_name]['days_counted'] += 1
     
     # Calculate averages and percentages
@@ -1598,43 +1793,15 @@ def get_time_analytics():
 
 @app.route('/api/productivity-insights', methods=['GET'])
 @login_required
+@cached_user_data('productivity_insights')
 def get_productivity_insights():
     """Get personalized productivity insights"""
     # Get user's most productive times
     productive_hours = get_productive_hours(current_user.id)
     
-    # Get category performance
-    categories = Category.query.filter_by(user_id=current_user.id).all()
-    category_performance = []
-    
-    for category in categories:
-        tasks = Task.query.filter_by(category_id=category.id, user_id=current_user.id).all()
-        completed_tasks = [t for t in tasks if t.completed]
-        
-        category_performance.append({
-            'name': category.name,
-            'color': category.color,
-            'total_tasks': len(tasks),
-            'completed_tasks': len(completed_tasks),
-            'completion_rate': (len(completed_tasks) / len(tasks) * 100) if tasks else 0,
-            'avg_time_spent': sum(t.get_total_time_spent() for t in tasks) / len(tasks) if tasks else 0
-        })
-    
-    # Get time estimation accuracy
-    tasks_with_estimates = Task.query.filter(
-        Task.user_id == current_user.id,
-        Task.estimated_minutes.isnot(None),
-        Task.actual_minutes.isnot(None),
-        Task.completed == True
-    ).all()
-    
-    estimation_accuracy = 0
-    if tasks_with_estimates:
-        total_error = 0
-        for task in tasks_with_estimates:
-            error = abs(task.actual_minutes - task.estimated_minutes) / task.estimated_minutes
-            total_error += error
-        estimation_accuracy = (1 - (total_error / len(tasks_with_estimates))) * 100
+    # Per-category performance and estimation accuracy, one grouped query each
+    category_performance = get_category_performance(current_user.id)
+    estimation_accuracy = get_estimation_accuracy(current_user.id)
     
     insights = {
         'productive_hours': productive_hours,
@@ -1671,8 +1838,83 @@ def generate_productivity_recommendations(productive_hours, category_performance
     
     return recommendations
 
+@app.route('/api/productivity/analytics', methods=['GET'])
+@login_required
+@cached_user_data('productivity_analytics')
+@statement_timeout()
+def get_productivity_analytics_data():
+    """Metrics and chart data for the analytics page, read from daily rollups"""
+    try:
+        days = parse_range_days(request.args.get('days'), 7)
+    except RangeLimitError as e:
+        return jsonify({'error': str(e)}), 400
+
+    end_date = datetime.now(pacific_tz).date()
+    start_date = end_date - timedelta(days=days - 1)
+    category_totals = None
+    if days in PRECOMPUTED_WINDOWS:
+        category_totals = get_window_totals(current_user.id, days, end_date)['categories']
+    return jsonify(get_productivity_analytics(current_user.id, start_date, end_date, category_totals))
+
+@app.route('/api/productivity/heatmap', methods=['GET'])
+@login_required
+@cached_user_data('productivity_heatmap')
+@statement_timeout()
+def get_productivity_heatmap():
+    """Weekday by time-of-day matrix of planned and completed minutes"""
+    try:
+        days = parse_range_days(request.args.get('days'), 365)
+        slot_minutes = int(request.args.get('slot_minutes', 60))
+    except RangeLimitError as e:
+        return jsonify({'error': str(e)}), 400
+    except ValueError:
+        return jsonify({'error': 'slot_minutes must be a whole number'}), 400
+    try:
+        category_id = optional_int(request.args.get('category_id'))
+    except ValueError:
+        return jsonify({'error': 'category_id must be a whole number'}), 400
+    if slot_minutes not in HEATMAP_SLOT_MINUTES:
+        return jsonify({'error': f'slot_minutes must be one of {", ".join(map(str, HEATMAP_SLOT_MINUTES))}'}), 400
+    if category_id is not None:
+        Category.query.filter_by(id=category_id, user_id=current_user.id).first_or_404()
+
+    end_date = datetime.now(pacific_tz).date()
+    start_date = end_date - timedelta(days=days - 1)
+    return jsonify(get_weekday_heatmap(current_user.id, start_date, end_date, slot_minutes, category_id))
+
+@app.route('/api/trends', methods=['GET'])
+@login_required
+@cached_user_data('trends')
+@statement_timeout()
+def get_trends():
+    """Category time series, daily/weekly/monthly depending on the range (?days=N or ?days=all)"""
+    end_date = datetime.now(pacific_tz).date()
+    try:
+        days = parse_range_days(request.args.get('days'), 365, allow_all=True)
+    except RangeLimitError as e:
+        return jsonify({'error': str(e)}), 400
+    if days == 'all':
+        first_date = db.session.query(func.min(DailyCategoryRollup.date)).filter(
+            DailyCategoryRollup.user_id == current_user.id
+        ).scalar()
+        start_date = min(first_date or end_date, end_date)
+    else:
+        start_date = end_date - timedelta(days=days - 1)
+
+    return jsonify(get_trend_series(current_user.id, start_date, end_date))
+
+@app.route('/api/insights', methods=['GET'])
+@login_required
+@cached_user_data('insights')
+@statement_timeout()
+def get_insights():
+    """Plain-text insights for the analytics page, comparing the last 30 days with the 30 before"""
+    today = datetime.now(pacific_tz).date()
+    return jsonify(get_productivity_insight_messages(current_user.id, today))
+
 @app.route('/api/work-hour-settings', methods=['POST'])
 @login_required
+@invalidates_user_data
 def update_work_hour_settings():
     """Update user's work hour goals"""
     try:
@@ -1686,6 +1928,14 @@ def update_work_hour_settings():
         if monthly_goal < 1 or monthly_goal > 744:
             return jsonify({'success': False, 'message': 'Monthly goal must be between 1 and 744 hours'})
         
+        # Update tracked categories if provided (empty list resets to the defaults)
+        if 'tracked_categories' in data:
+            tracked_categories = data.get('tracked_categories') or []
+            if not isinstance(tracked_categories, list) or not all(isinstance(name, str) for name in tracked_categories):
+                return jsonify({'success': False, 'message': 'Tracked categories must be a list of category names'})
+            tracked_categories = [name.strip() for name in tracked_categories if name.strip()]
+            current_user.tracked_categories = tracked_categories or None
+        
         # Update user goals
         current_user.weekly_work_goal = weekly_goal
         current_user.monthly_work_goal = monthly_goal
@@ -1699,6 +1949,7 @@ def update_work_hour_settings():
 
 @app.route('/api/work-hour-stats')
 @login_required
+@cached_user_data('work_hour_stats')
 def get_work_hour_stats():
     """Get work hour statistics for progress bars - tracks multiple categories"""
     try:
@@ -1721,80 +1972,51 @@ def get_work_hour_stats():
         work_week_start = end_date - timedelta(days=days_since_monday)
         work_week_end = end_date
         
-        # Categories to track (Work, Consulting, Church, Personal)
-        tracked_categories = ['Work', 'Consulting', 'Church', 'Personal']
+        # Categories to track: ?categories=A,B overrides the user's saved list
+        categories_param = request.args.get('categories')
+        if categories_param:
+            tracked_categories = [name.strip() for name in categories_param.split(',') if name.strip()]
+        else:
+            tracked_categories = current_user.tracked_categories or DEFAULT_TRACKED_CATEGORIES
         
-        # Get all user categories
-        user_categories = Category.query.filter_by(user_id=current_user.id).all()
-        category_map = {cat.name: cat for cat in user_categories}
+        # One conditional-aggregate query covers every window, category and PTO
+        windows = {
+            'seven_day': seven_days_ago,
+            'thirty_day': thirty_days_ago,
+            'work_week': work_week_start
+        }
+        category_rows, pto_minutes = get_category_window_minutes(
+            current_user.id, tracked_categories, windows, end_date
+        )
         
         # Initialize stats structure
-        category_stats = {}
-        
-        for cat_name in tracked_categories:
-            category = category_map.get(cat_name)
-            if category:
-                # Calculate 7-day hours for this category
-                seven_day_blocks = TimeBlock.query.join(DailyPlan).join(Task).filter(
-                    DailyPlan.user_id == current_user.id,
-                    DailyPlan.date.between(seven_days_ago, end_date),
-                    Task.category_id == category.id
-                ).all()
-                seven_day_minutes = sum(15 for block in seven_day_blocks)
-                
-                # Calculate 30-day hours for this category
-                thirty_day_blocks = TimeBlock.query.join(DailyPlan).join(Task).filter(
-                    DailyPlan.user_id == current_user.id,
-                    DailyPlan.date.between(thirty_days_ago, end_date),
-                    Task.category_id == category.id
-                ).all()
-                thirty_day_minutes = sum(15 for block in thirty_day_blocks)
-                
-                # Calculate work week hours (Monday-Sunday) for this category
-                work_week_blocks = TimeBlock.query.join(DailyPlan).join(Task).filter(
-                    DailyPlan.user_id == current_user.id,
-                    DailyPlan.date.between(work_week_start, work_week_end),
-                    Task.category_id == category.id
-                ).all()
-                work_week_minutes = sum(15 for block in work_week_blocks)
-                
-                category_stats[cat_name.lower()] = {
-                    'name': cat_name,
-                    'color': category.color,
-                    'seven_day': round(seven_day_minutes / 60, 1),
-                    'thirty_day': round(thirty_day_minutes / 60, 1),
-                    'work_week': round(work_week_minutes / 60, 1)
-                }
-            else:
-                category_stats[cat_name.lower()] = {
-                    'name': cat_name,
-                    'color': '#6c757d',
-                    'seven_day': 0,
-                    'thirty_day': 0,
-                    'work_week': 0
-                }
-        
-        # Add PTO hours to Work category for 7-day and 30-day periods
-        seven_day_pto = db.session.query(db.func.sum(DailyPlan.pto_hours)).filter(
-            DailyPlan.user_id == current_user.id,
-            DailyPlan.date.between(seven_days_ago, end_date)
-        ).scalar() or 0
-        
-        thirty_day_pto = db.session.query(db.func.sum(DailyPlan.pto_hours)).filter(
-            DailyPlan.user_id == current_user.id,
-            DailyPlan.date.between(thirty_days_ago, end_date)
-        ).scalar() or 0
+        category_minutes = {
+            cat_name.lower(): {
+                'name': cat_name,
+                'color': '#6c757d',
+                **{window: 0 for window in windows}
+            }
+            for cat_name in tracked_categories
+        }
+        for row in sorted(category_rows, key=lambda r: r['id']):
+            entry = category_minutes[row['name'].lower()]
+            entry['color'] = row['color']
+            for window in windows:
+                entry[window] += float(row[window])
         
-        work_week_pto = db.session.query(db.func.sum(DailyPlan.pto_hours)).filter(
-            DailyPlan.user_id == current_user.id,
-            DailyPlan.date.between(work_week_start, work_week_end)
-        ).scalar() or 0
+        # PTO counts toward Work hours
+        if 'work' in category_minutes:
+            for window in windows:
+                category_minutes['work'][window] += float(pto_minutes[window])
         
-        # Add PTO to work hours
-        if 'work' in category_stats:
-            category_stats['work']['seven_day'] = round(category_stats['work']['seven_day'] + seven_day_pto, 1)
-            category_stats['work']['thirty_day'] = round(category_stats['work']['thirty_day'] + thirty_day_pto, 1)
-            category_stats['work']['work_week'] = round(category_stats['work']['work_week'] + work_week_pto, 1)
+        category_stats = {
+            key: {
+                'name': entry['name'],
+                'color': entry['color'],
+                **{window: round(entry[window] / 60, 1) for window in windows}
+            }
+            for key, entry in category_minutes.items()
+        }
         
         # For backward compatibility, also include the old format
         work_stats = category_stats.get('work', {})
@@ -1806,6 +2028,7 @@ def get_work_hour_stats():
             'weekly_goal': current_user.weekly_work_goal or 32,
             'monthly_goal': current_user.monthly_work_goal or 140,
             'category_stats': category_stats,
+            'tracked_categories': tracked_categories,
             'work_week_start': work_week_start.strftime('%Y-%m-%d'),
             'work_week_end': work_week_end.strftime('%Y-%m-%d')
         })
@@ -1814,6 +2037,29 @@ def get_work_hour_stats():
         app.logger.error(f"Error getting work hour stats: {str(e)}")
         return jsonify({'success': False, 'message': 'Failed to get work hour statistics'})
 
+@app.route('/api/work-hour-forecast', methods=['GET'])
+@login_required
+@cached_user_data('work_hour_forecast')
+def get_work_hour_forecast():
+    """Projected end-of-week and end-of-month hours against the user's work goals"""
+    date_str = request.args.get('date')
+    try:
+        today = datetime.strptime(date_str, '%Y-%m-%d').date() if date_str else get_current_pacific_date()
+    except ValueError:
+        return jsonify({'error': 'Invalid date format'}), 400
+    category_name = request.args.get('category', 'Work')
+
+    # PTO counts toward Work hours, as in the progress bars
+    forecast = get_goal_forecast(
+        current_user.id,
+        category_name,
+        today,
+        current_user.weekly_work_goal or 32,
+        current_user.monthly_work_goal or 140,
+        include_pto=category_name.lower() == 'work'
+    )
+    return jsonify(forecast)
+
 @app.route('/admin-dashboard')
 @login_required
 def admin_dashboard():
@@ -1823,6 +2069,60 @@ def admin_dashboard():
         return redirect(url_for('index'))
     return render_template('admin_dashboard.html')
 
+def admin_required(f):
+    """Decorator for admin-only API routes; responds 403 for everyone else."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not current_user.is_admin:
+            return jsonify({'error': 'Admin access required'}), 403
+        return f(*args, **kwargs)
+    return decorated_function
+
+@app.route('/api/admin/stats', methods=['GET'])
+@login_required
+@admin_required
+@statement_timeout(ADMIN_STATEMENT_TIMEOUT_MS)
+def get_admin_stats():
+    """Active users, daily plan/block activity and top categories across all users"""
+    try:
+        days = parse_range_days(request.args.get('days'), 30, max_days=366)
+    except RangeLimitError as e:
+        return jsonify({'error': str(e)}), 400
+
+    end_date = get_current_pacific_date()
+    start_date = end_date - timedelta(days=days - 1)
+    return jsonify({
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'users': get_active_user_counts(),
+        'daily_activity': get_daily_activity(start_date, end_date),
+        'top_categories': get_top_categories(start_date, end_date)
+    })
+
+@app.route('/api/admin/users', methods=['GET'])
+@login_required
+@admin_required
+@statement_timeout(ADMIN_STATEMENT_TIMEOUT_MS)
+def get_admin_user_footprints():
+    """Paginated per-user storage footprint (row counts per table)"""
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 50, type=int)
+    sort = request.args.get('sort', 'total_rows')
+    if page < 1 or not 1 <= per_page <= 200:
+        return jsonify({'error': 'page must be positive and per_page between 1 and 200'}), 400
+    if sort not in FOOTPRINT_SORTS:
+        return jsonify({'error': f'sort must be one of {", ".join(FOOTPRINT_SORTS)}'}), 400
+
+    users, total = get_user_footprints(page, per_page, sort)
+    return jsonify({
+        'users': users,
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'pages': (total + per_page - 1) // per_page,
+        'sort': sort
+    })
+
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()
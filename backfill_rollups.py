@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Rollup Backfill Script for TimeBlocker
+
+Builds the daily, weekly and monthly category rollups from existing time blocks,
+the per-category estimation statistics from completed tasks, and the
+productive-hour histogram.
+Safe to re-run: each user's rollups are rebuilt from scratch.
+
+Usage: python backfill_rollups.py [user_id ...]
+"""
+
+import sys
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def backfill_rollups(user_ids=None):
+    """Rebuild rollups for the given users, or for every user when none are given"""
+    from app import app, db
+    from models import User
+    from rollups import refresh_daily_rollups
+    from estimation_stats import rebuild_estimation_stats
+    from task_analytics import rebuild_productive_hour_counts
+
+    with app.app_context():
+        # Make sure the rollup table exists on databases created before it was added
+        db.create_all()
+
+        if not user_ids:
+            user_ids = [user_id for (user_id,) in db.session.query(User.id).order_by(User.id).all()]
+
+        for user_id in user_ids:
+            try:
+                refresh_daily_rollups(user_id)
+                rebuild_estimation_stats(user_id)
+                rebuild_productive_hour_counts(user_id)
+                db.session.commit()
+                logger.info(f"✅ Rebuilt rollups for user {user_id}")
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"❌ Failed to rebuild rollups for user {user_id}: {str(e)}")
+                return False
+
+        logger.info(f"🎉 Backfilled rollups for {len(user_ids)} users")
+        return True
+
+if __name__ == "__main__":
+    requested_ids = [int(arg) for arg in sys.argv[1:]]
+    sys.exit(0 if backfill_rollups(requested_ids) else 1)
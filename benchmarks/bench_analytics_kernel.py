@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark: columnar analytics kernel vs. per-block Python loops
+
+Builds a synthetic multi-year block history in memory and times the category,
+day, week and hour rollups both ways. No database is needed.
+
+Usage: python benchmarks/bench_analytics_kernel.py [years] [blocks_per_day]
+"""
+
+import os
+import sys
+import random
+import time
+from datetime import date, time as time_of_day, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics_kernel import columns_from_rows, category_rollup, day_rollup, week_rollup, hour_rollup
+
+
+def synthetic_rows(years, blocks_per_day, num_categories=8, num_tasks=400):
+    """(date, slot, category_id, task_id, completed) tuples, like load_block_columns fetches."""
+    rng = random.Random(42)
+    end_date = date(2026, 10, 19)
+    start_date = end_date - timedelta(days=365 * years - 1)
+    rows = []
+    for offset in range((end_date - start_date).days + 1):
+        day = start_date + timedelta(days=offset)
+        for slot in rng.sample(range(28, 28 + 48), blocks_per_day):
+            task_id = rng.randrange(num_tasks)
+            rows.append((day, slot, task_id % num_categories, task_id, rng.random() < 0.7))
+    return rows, start_date, end_date
+
+
+def loop_rollups(rows, start_date):
+    """The nested-dict aggregation style the endpoints used before the kernel."""
+    categories, days, weeks, hours = {}, {}, {}, {}
+    for day, slot, category_id, task_id, completed in rows:
+        start = time_of_day(slot // 4, (slot % 4) * 15)
+        week_start = day - timedelta(days=day.weekday())
+        for bucket, key in ((categories, category_id), (days, day), (weeks, week_start), (hours, start.hour)):
+            if key not in bucket:
+                bucket[key] = {'planned': 0, 'completed': 0}
+            bucket[key]['planned'] += 15
+            if completed:
+                bucket[key]['completed'] += 15
+    return categories, days, weeks, hours
+
+
+def kernel_rollups(rows, start_date, end_date):
+    cols = columns_from_rows(rows, start_date, end_date)
+    return category_rollup(cols), day_rollup(cols), week_rollup(cols), hour_rollup(cols)
+
+
+def best_of(fn, *args, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main():
+    years = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    blocks_per_day = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    rows, start_date, end_date = synthetic_rows(years, blocks_per_day)
+    print(f"Synthetic history: {years} years, {len(rows):,} blocks")
+
+    loop_time, (loop_categories, *_) = best_of(loop_rollups, rows, start_date)
+    kernel_time, (kernel_categories, *_) = best_of(kernel_rollups, rows, start_date, end_date)
+
+    cols = columns_from_rows(rows, start_date, end_date)
+    rollup_time, _ = best_of(lambda: (category_rollup(cols), day_rollup(cols), week_rollup(cols), hour_rollup(cols)))
+
+    assert {k: (v['planned'], v['completed']) for k, v in loop_categories.items()} == kernel_categories
+
+    print(f"Python loops:             {loop_time * 1000:8.1f} ms")
+    print(f"Kernel (incl. columnize): {kernel_time * 1000:8.1f} ms  ({loop_time / kernel_time:.1f}x)")
+    print(f"Kernel (rollups only):    {rollup_time * 1000:8.1f} ms  ({loop_time / rollup_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
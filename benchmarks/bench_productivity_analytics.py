@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark: latency budget for the analytics page endpoints
+
+Seeds a throwaway SQLite database with a multi-year block history, builds the
+daily rollups, then times the uncached work behind /api/productivity/analytics
+(365-day range) and /api/insights. Exits non-zero if either p95 exceeds the budget.
+
+Usage: python benchmarks/bench_productivity_analytics.py [years] [budget_ms]
+"""
+
+import math
+import os
+import sys
+import random
+import tempfile
+import time
+from datetime import date, time as time_of_day, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from cache_utils import init_cache
+from models import db, User, Category, Task, DailyPlan, TimeBlock
+from rollups import refresh_daily_rollups
+from task_analytics import rebuild_productive_hour_counts
+from productivity_analytics import get_productivity_analytics, get_productivity_insight_messages
+
+TODAY = date(2026, 10, 19)
+RUNS = 50
+
+
+def seed_history(years, blocks_per_day=32, num_categories=8, num_tasks=200):
+    rng = random.Random(7)
+    user = User(username='bench', email='bench@example.com')
+    db.session.add(user)
+    db.session.flush()
+
+    categories = [Category(name=f'Category {i}', color='#007bff', user_id=user.id) for i in range(num_categories)]
+    db.session.add_all(categories)
+    db.session.flush()
+    task_ids = []
+    for i in range(num_tasks):
+        task = Task(title=f'Task {i}', category_id=categories[i % num_categories].id, user_id=user.id,
+                    estimated_minutes=30, actual_minutes=rng.choice([20, 30, 45]), completed=rng.random() < 0.5)
+        db.session.add(task)
+        db.session.flush()
+        task_ids.append(task.id)
+
+    num_days = 365 * years
+    plans = [{'user_id': user.id, 'date': TODAY - timedelta(days=offset), 'pto_hours': 0.0}
+             for offset in range(num_days)]
+    db.session.execute(DailyPlan.__table__.insert(), plans)
+    plan_ids = [plan_id for (plan_id,) in db.session.query(DailyPlan.id).filter_by(user_id=user.id)]
+
+    blocks = []
+    for plan_id in plan_ids:
+        for slot in range(28, 28 + blocks_per_day):
+            start = time_of_day(slot // 4, (slot % 4) * 15)
+            end_slot = slot + 1
+            blocks.append({
+                'daily_plan_id': plan_id,
+                'start_time': start,
+                'end_time': time_of_day(end_slot // 4, (end_slot % 4) * 15),
+                'task_id': rng.choice(task_ids),
+                'completed': rng.random() < 0.6
+            })
+    db.session.execute(TimeBlock.__table__.insert(), blocks)
+    refresh_daily_rollups(user.id)
+    rebuild_productive_hour_counts(user.id)
+    db.session.commit()
+    return user.id, len(blocks)
+
+
+def p95(fn, *args):
+    timings = []
+    for _ in range(RUNS):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        fn(*args)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return timings[math.ceil(len(timings) * 0.95) - 1], timings[len(timings) // 2]
+
+
+def main():
+    years = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    budget_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 50.0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        db.init_app(app)
+        init_cache(app)
+        with app.app_context():
+            db.create_all()
+            user_id, num_blocks = seed_history(years)
+            print(f"Synthetic history: {years} years, {num_blocks:,} blocks")
+
+            results = {
+                'analytics (365 days)': p95(get_productivity_analytics, user_id, TODAY - timedelta(days=364), TODAY),
+                'insights': p95(get_productivity_insight_messages, user_id, TODAY)
+            }
+
+    failed = False
+    for name, (p95_ms, median_ms) in results.items():
+        status = 'ok' if p95_ms <= budget_ms else 'OVER BUDGET'
+        failed = failed or p95_ms > budget_ms
+        print(f"{name:<22} p50 {median_ms:6.1f} ms   p95 {p95_ms:6.1f} ms   (budget {budget_ms:.0f} ms) {status}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark: /api/tasks/analytics as one SQL aggregate vs. loading every task
+
+Seeds a throwaway SQLite database with one user's tasks at several sizes and
+times the old load-all-then-count approach against get_task_summary.
+
+Usage: python benchmarks/bench_task_analytics.py [sizes...]   (default: 5000 20000 100000)
+"""
+
+import os
+import sys
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from models import db, User, Category, Task
+from task_analytics import get_task_summary
+
+STATUSES = ['pending', 'in_progress', 'blocked', 'completed']
+PRIORITIES = ['urgent', 'high', 'medium', 'low']
+
+
+def seed_tasks(user_id, category_id, count):
+    rng = random.Random(count)
+    now = datetime.utcnow()
+    rows = []
+    for i in range(count):
+        completed = rng.random() < 0.6
+        rows.append({
+            'title': f'Task {i}',
+            'category_id': category_id,
+            'user_id': user_id,
+            'created_at': now - timedelta(minutes=i),
+            'due_date': now + timedelta(days=rng.randint(-60, 60)) if rng.random() < 0.5 else None,
+            'status': rng.choice(STATUSES),
+            'priority': rng.choice(PRIORITIES),
+            'completed': completed,
+            'estimated_minutes': rng.choice([None, 15, 30, 60, 120]),
+            'actual_minutes': rng.choice([None, 20, 45, 90]) if completed else None,
+            'tracked_minutes': rng.randrange(0, 600, 15),
+            'completed_minutes': rng.randrange(0, 300, 15)
+        })
+    db.session.execute(Task.__table__.insert(), rows)
+    db.session.commit()
+
+
+def load_all_summary(user_id):
+    """The per-request approach the endpoint used before the aggregate query."""
+    tasks = Task.query.filter_by(user_id=user_id).all()
+    completed = len([t for t in tasks if t.completed])
+    return {
+        'total_tasks': len(tasks),
+        'completed_tasks': completed,
+        'pending_tasks': len([t for t in tasks if t.status == 'pending']),
+        'in_progress_tasks': len([t for t in tasks if t.status == 'in_progress']),
+        'blocked_tasks': len([t for t in tasks if t.status == 'blocked']),
+        'overdue_tasks': len([t for t in tasks if t.is_overdue()]),
+        'priority_breakdown': {p: len([t for t in tasks if t.priority == p]) for p in PRIORITIES},
+        'total_estimated_hours': sum(t.estimated_minutes or 0 for t in tasks) / 60,
+        'total_actual_hours': sum(t.actual_minutes or 0 for t in tasks) / 60,
+        'total_tracked_hours': sum(t.completed_minutes or 0 for t in tasks) / 60,
+        'completion_rate': (completed / len(tasks) * 100) if tasks else 0
+    }
+
+
+def best_of(fn, *args, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        result = fn(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def run(size):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        db.init_app(app)
+        with app.app_context():
+            db.create_all()
+            user = User(username='bench', email='bench@example.com')
+            db.session.add(user)
+            db.session.flush()
+            category = Category(name='Work', color='#000000', user_id=user.id)
+            db.session.add(category)
+            db.session.commit()
+            seed_tasks(user.id, category.id, size)
+
+            now = datetime.utcnow()
+            load_time, expected = best_of(load_all_summary, user.id)
+            sql_time, actual = best_of(get_task_summary, user.id, now)
+            assert expected == actual, (expected, actual)
+            db.session.remove()
+    return load_time, sql_time
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [5000, 20000, 100000]
+    print(f"{'tasks':>8}  {'load all':>10}  {'aggregate':>10}  speedup")
+    for size in sizes:
+        load_time, sql_time = run(size)
+        print(f"{size:>8,}  {load_time * 1000:8.1f} ms  {sql_time * 1000:8.1f} ms  {load_time / sql_time:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Benchmark: task list serialization, per-task ORM dicts vs. task_serializer
+
+Seeds a throwaway SQLite database with one user's tasks (with roles and subtasks)
+and times building the GET /api/tasks body from ORM objects with stdlib json (with
+category/role/subtasks lazy-loaded per task, and eager-loaded) against
+load_task_rows + load_task_lookups + serialize_tasks encoded with orjson, in the full
+and the normalized (?format=normalized) formats. The three full bodies are checked to
+decode identically.
+
+Usage: python benchmarks/bench_task_serializer.py [sizes...]   (default: 1000 2000 5000)
+"""
+
+import os
+import sys
+import json
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import orjson
+from flask import Flask
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+from models import db, User, Category, Role, Task
+from task_serializer import load_task_rows, load_task_lookups, serialize_tasks, normalize_task_lookups
+from json_provider import ORJSON_ENGINE_OPTIONS
+
+STATUSES = ['pending', 'in_progress', 'blocked', 'completed']
+PRIORITIES = ['urgent', 'high', 'medium', 'low']
+
+
+def seed_tasks(user_id, category_ids, role_ids, count):
+    rng = random.Random(count)
+    now = datetime.utcnow()
+    rows = []
+    for i in range(count):
+        completed = rng.random() < 0.6
+        rows.append({
+            'title': f'Task {i}',
+            'description': 'Something to do ' * rng.randint(0, 4),
+            'category_id': rng.choice(category_ids),
+            'role_id': rng.choice(role_ids + [None]),
+            'user_id': user_id,
+            'created_at': now - timedelta(minutes=i),
+            'due_date': now + timedelta(days=rng.randint(-60, 60)) if rng.random() < 0.5 else None,
+            'status': rng.choice(STATUSES),
+            'priority': rng.choice(PRIORITIES),
+            'completed': completed,
+            'estimated_minutes': rng.choice([None, 15, 30, 60, 120]),
+            'actual_minutes': rng.choice([None, 20, 45, 90]) if completed else None,
+            'tags': rng.choice([[], ['deep'], ['deep', 'admin']]),
+            'dependencies': [],
+            'progress_percentage': rng.randrange(0, 101, 10),
+            'is_recurring': False,
+            'parent_task_id': rng.randint(1, i) if i and rng.random() < 0.1 else None,
+            'tracked_minutes': rng.randrange(0, 600, 15),
+            'completed_minutes': rng.randrange(0, 300, 15)
+        })
+    db.session.execute(Task.__table__.insert(), rows)
+    db.session.commit()
+
+
+def orm_dicts(tasks, subtask_count):
+    """The per-task dict GET /api/tasks built before task_serializer."""
+    return [{
+        'id': task.id,
+        'title': task.title,
+        'description': task.description,
+        'category_id': task.category_id,
+        'category_name': task.category.name,
+        'category_color': task.category.color,
+        'due_date': task.due_date.isoformat() if task.due_date else None,
+        'status': task.status,
+        'status_color': task.get_status_color(),
+        'role_id': task.role_id,
+        'role_name': task.assigned_role.name if task.assigned_role else None,
+        'is_recurring': task.is_recurring,
+        'recurrence_rule': task.recurrence_rule,
+        'priority': task.priority,
+        'priority_color': task.get_priority_color(),
+        'completed': task.completed,
+        'completed_at': task.completed_at.isoformat() if task.completed_at else None,
+        'estimated_minutes': task.estimated_minutes,
+        'actual_minutes': task.actual_minutes,
+        'total_time_spent': task.completed_minutes or 0,
+        'notes': task.notes,
+        'tags': task.tags or [],
+        'dependencies': task.dependencies or [],
+        'progress_percentage': task.progress_percentage,
+        'last_worked_on': task.last_worked_on.isoformat() if task.last_worked_on else None,
+        'parent_task_id': task.parent_task_id,
+        'subtask_count': subtask_count(task),
+        'is_overdue': task.is_overdue(),
+        'created_at': task.created_at.isoformat()
+    } for task in tasks]
+
+
+def lazy_orm_body(user_id):
+    """ORM objects with category, role and subtasks lazy-loaded per task."""
+    tasks = Task.query.filter_by(user_id=user_id).order_by(Task.created_at.desc(), Task.id.desc()).all()
+    return json.dumps(orm_dicts(tasks, lambda task: len(task.subtasks)), sort_keys=True)
+
+
+def eager_orm_body(user_id):
+    """ORM objects with category and role joined and subtask counts from one grouped query."""
+    tasks = Task.query.filter_by(user_id=user_id).options(
+        joinedload(Task.category), joinedload(Task.assigned_role)
+    ).order_by(Task.created_at.desc(), Task.id.desc()).all()
+    counts = dict(db.session.query(Task.parent_task_id, func.count(Task.id)).filter(
+        Task.parent_task_id.isnot(None)
+    ).group_by(Task.parent_task_id).all())
+    return json.dumps(orm_dicts(tasks, lambda task: counts.get(task.id, 0)), sort_keys=True)
+
+
+def serializer_body(user_id):
+    query = Task.query.filter_by(user_id=user_id).order_by(Task.created_at.desc(), Task.id.desc())
+    tasks = load_task_rows(query)
+    return orjson.dumps(serialize_tasks(tasks, load_task_lookups(user_id, tasks)), option=orjson.OPT_SORT_KEYS)
+
+
+def normalized_body(user_id):
+    query = Task.query.filter_by(user_id=user_id).order_by(Task.created_at.desc(), Task.id.desc())
+    tasks = load_task_rows(query)
+    lookups = load_task_lookups(user_id, tasks)
+    return orjson.dumps({'tasks': serialize_tasks(tasks, lookups, normalized=True), **normalize_task_lookups(lookups)},
+                        option=orjson.OPT_SORT_KEYS)
+
+
+def best_of(fn, *args, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        result = fn(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def run(size):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = ORJSON_ENGINE_OPTIONS
+        db.init_app(app)
+        with app.app_context():
+            db.create_all()
+            user = User(username='bench', email='bench@example.com')
+            db.session.add(user)
+            db.session.flush()
+            categories = [Category(name=f'Category {i}', color='#000000', user_id=user.id) for i in range(8)]
+            roles = [Role(name=f'Role {i}', user_id=user.id) for i in range(4)]
+            db.session.add_all(categories + roles)
+            db.session.commit()
+            seed_tasks(user.id, [c.id for c in categories], [r.id for r in roles], size)
+
+            lazy_time, expected = best_of(lazy_orm_body, user.id)
+            eager_time, eager = best_of(eager_orm_body, user.id)
+            fast_time, actual = best_of(serializer_body, user.id)
+            normalized_time, normalized = best_of(normalized_body, user.id)
+            assert json.loads(expected) == json.loads(eager) == orjson.loads(actual)
+            db.session.remove()
+    return lazy_time, eager_time, fast_time, normalized_time, len(actual), len(normalized)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 2000, 5000]
+    print(f"{'tasks':>8}  {'lazy ORM':>11}  {'eager ORM':>11}  {'serializer':>11}  {'normalized':>11}  "
+          f"{'us/task (eager -> serializer)':>30}  {'KB (full -> normalized)':>24}")
+    for size in sizes:
+        lazy_time, eager_time, fast_time, normalized_time, full_bytes, normalized_bytes = run(size)
+        per_task = f"{eager_time / size * 1e6:.1f} -> {fast_time / size * 1e6:.1f}"
+        size_change = f"{full_bytes / 1024:.0f} -> {normalized_bytes / 1024:.0f}"
+        print(f"{size:>8,}  {lazy_time * 1000:8.1f} ms  {eager_time * 1000:8.1f} ms  {fast_time * 1000:8.1f} ms  "
+              f"{normalized_time * 1000:8.1f} ms  {per_task:>30}  {size_change:>24}")
+
+
+if __name__ == "__main__":
+    main()
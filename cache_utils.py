@@ -1,11 +1,18 @@
 from functools import wraps
-from flask import current_app
+from flask import current_app, request, make_response, session
 from datetime import datetime, timedelta
 import json
+import logging
+import pytz
 from flask_caching import Cache
 
+logger = logging.getLogger(__name__)
+
 cache = Cache()
 
+# Versioned entries are never read again once the version or day moves on; the TTL lets them age out
+USER_DATA_CACHE_TIMEOUT = 24 * 60 * 60
+
 def init_cache(app):
     """Initialize cache with Redis or simple memory cache"""
     cache_config = {
@@ -58,6 +65,74 @@ def invalidate_cache(pattern):
     prefix = f"{cache_key_prefix()}_{pattern}"
     cache.delete_many(prefix)
 
+def get_data_version(user):
+    """Current version of a user's plans, tasks and categories (bumped on every write)"""
+    return user.data_version or 0
+
+def bump_data_version(user_id):
+    """Invalidate every cached result for a user by advancing their data version.
+
+    The increment happens in SQL inside the caller's transaction, so it commits or
+    rolls back with the write it covers. Because the version lives on the user row
+    every worker sees it on its next request.
+    """
+    from models import db, User
+    db.session.query(User).filter(User.id == user_id).update(
+        {User.data_version: db.func.coalesce(User.data_version, 0) + 1},
+        synchronize_session=False
+    )
+
+def invalidates_user_data(f):
+    """Bump the current user's data version in the same transaction as a write request.
+
+    The bump runs before the view, so the user row is the first row a write locks:
+    a user's concurrent writes queue on it instead of deadlocking on each other's rows.
+    Views that fail roll the bump back along with their own changes.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        from flask_login import current_user
+        if request.method != 'GET' and current_user.is_authenticated:
+            bump_data_version(current_user.id)
+        return f(*args, **kwargs)
+    return decorated_function
+
+def cached_user_data(key_prefix):
+    """Cache a view per (user, endpoint, query args) until the user's data changes.
+
+    Entries are keyed by the user's data version, so repeat requests are served from
+    the cache until a write bumps the version; superseded entries expire after a day.
+    The Pacific date is part of the key so "today"-relative results roll over at midnight.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            from flask_login import current_user
+            # A page rendered with pending flash messages must neither replay a cached copy
+            # (the flashes would stay queued) nor be cached (they would show on every hit)
+            if not current_user.is_authenticated or session.get('_flashes'):
+                return f(*args, **kwargs)
+
+            today = datetime.now(pytz.timezone('America/Los_Angeles')).date().isoformat()
+            query_args = json.dumps(sorted(request.args.items(multi=True)))
+            cache_key = (f"{cache_key_prefix()}_v{get_data_version(current_user)}_{key_prefix}"
+                         f"_{today}_{query_args}")
+
+            cached_response = cache.get(cache_key)
+            if cached_response is not None:
+                body, status, mimetype = cached_response
+                return current_app.response_class(body, status=status, mimetype=mimetype)
+
+            response = make_response(f(*args, **kwargs))
+            payload = response.get_json(silent=True) if response.is_json else None
+            failed = isinstance(payload, dict) and payload.get('success') is False
+            if response.status_code == 200 and not failed:
+                cache.set(cache_key, (response.get_data(), response.status_code, response.mimetype),
+                          timeout=USER_DATA_CACHE_TIMEOUT)
+            return response
+        return decorated_function
+    return decorator
+
 def get_paginated_results(query, page, per_page=20):
     """Helper function for pagination"""
     return query.paginate(page=page, per_page=per_page, error_out=False)
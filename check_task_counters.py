@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Task Counter Consistency Check for TimeBlocker
+
+Recounts every task's scheduled and completed minutes from its time blocks and
+reports tasks whose maintained tracked_minutes/completed_minutes counters differ.
+Pass --repair to overwrite mismatched counters with the recount.
+
+Usage: python check_task_counters.py [--repair] [user_id ...]
+"""
+
+import sys
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def check_counters(user_ids=None, repair=False):
+    """Check (and optionally repair) task counters; returns True when all counters are consistent"""
+    from app import app, db
+    from rollups import check_task_counters
+
+    with app.app_context():
+        mismatches = []
+        for user_id in (user_ids or [None]):
+            mismatches.extend(check_task_counters(user_id, repair=repair))
+
+        for task_id, stored, actual in mismatches:
+            logger.warning(f"Task {task_id}: stored (tracked, completed)={stored}, actual={actual}")
+
+        if not mismatches:
+            logger.info("✅ All task counters are consistent")
+            return True
+
+        if repair:
+            db.session.commit()
+            logger.info(f"🔧 Repaired {len(mismatches)} task counters")
+            return True
+
+        logger.error(f"❌ {len(mismatches)} task counters are out of date (re-run with --repair)")
+        return False
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    repair = '--repair' in args
+    requested_ids = [int(arg) for arg in args if arg != '--repair']
+    sys.exit(0 if check_counters(requested_ids, repair=repair) else 1)
@@ -0,0 +1,135 @@
+import math
+from sqlalchemy import func, text
+from models import db, Task, EstimationStats
+
+# Categories need a few completed tasks before their ratio is trusted over the user-wide one
+MIN_SAMPLES = 3
+
+def task_estimation_sample(task):
+    """The (category_id, actual/estimated ratio) a task contributes to the stats, or None.
+
+    Only completed tasks with a positive estimate and a positive actual count; the live
+    updates and rebuild_estimation_stats both go through here, so they always agree.
+    """
+    if not task.completed or not (task.estimated_minutes or 0) > 0 or not (task.actual_minutes or 0) > 0:
+        return None
+    return task.category_id, task.actual_minutes / task.estimated_minutes
+
+def _get_stats_row(user_id, category_id, create=False):
+    if create:
+        # Insert the empty row first (a no-op when it exists), so the locking select below
+        # always has a row to lock and concurrent first samples queue on it instead of
+        # both inserting and colliding on the unique constraint at commit
+        db.session.execute(text(
+            "INSERT INTO estimation_stats (user_id, category_id, count, mean_ratio, m2, abs_error_sum) "
+            "VALUES (:user_id, :category_id, 0, 0, 0, 0) "
+            "ON CONFLICT (user_id, category_id) DO NOTHING"
+        ), {'user_id': user_id, 'category_id': category_id})
+    return EstimationStats.query.filter_by(
+        user_id=user_id, category_id=category_id
+    ).with_for_update().first()
+
+def _welford_add(row, ratio):
+    row.count = (row.count or 0) + 1
+    delta = ratio - (row.mean_ratio or 0.0)
+    row.mean_ratio = (row.mean_ratio or 0.0) + delta / row.count
+    row.m2 = (row.m2 or 0.0) + delta * (ratio - row.mean_ratio)
+    row.abs_error_sum = (row.abs_error_sum or 0.0) + abs(ratio - 1)
+
+def add_estimation_sample(user_id, category_id, ratio):
+    """Fold one ratio into the running count, mean and variance (Welford's update)"""
+    _welford_add(_get_stats_row(user_id, category_id, create=True), ratio)
+
+def remove_estimation_sample(user_id, category_id, ratio):
+    """Take one previously added ratio back out of the running statistics"""
+    row = _get_stats_row(user_id, category_id)
+    if row is None or not row.count:
+        return
+    if row.count == 1:
+        row.count, row.mean_ratio, row.m2, row.abs_error_sum = 0, 0.0, 0.0, 0.0
+        return
+    previous_mean = (row.count * row.mean_ratio - ratio) / (row.count - 1)
+    row.m2 = max(row.m2 - (ratio - previous_mean) * (ratio - row.mean_ratio), 0.0)
+    row.mean_ratio = previous_mean
+    row.count -= 1
+    row.abs_error_sum = max(row.abs_error_sum - abs(ratio - 1), 0.0)
+
+def apply_estimation_change(user_id, before, after):
+    """Move a task's contribution from its old sample to its new one (either may be None)"""
+    if before == after:
+        return
+    if before is not None:
+        remove_estimation_sample(user_id, *before)
+    if after is not None:
+        add_estimation_sample(user_id, *after)
+
+def rebuild_estimation_stats(user_id):
+    """Recompute a user's statistics from their completed tasks (caller commits)"""
+    EstimationStats.query.filter_by(user_id=user_id).delete()
+    tasks = Task.query.filter(
+        Task.user_id == user_id,
+        Task.completed == True,
+        Task.estimated_minutes > 0,
+        Task.actual_minutes > 0
+    ).order_by(Task.id).all()
+
+    rows = {}
+    for task in tasks:
+        sample = task_estimation_sample(task)
+        if sample is None:
+            continue
+        category_id, ratio = sample
+        if category_id not in rows:
+            rows[category_id] = EstimationStats(user_id=user_id, category_id=category_id, count=0,
+                                                mean_ratio=0.0, m2=0.0, abs_error_sum=0.0)
+        _welford_add(rows[category_id], ratio)
+    db.session.add_all(rows.values())
+
+def _combine(rows):
+    """Merge per-category statistics into one (count, mean, m2) triple (Chan et al.)"""
+    count, mean, m2 = 0, 0.0, 0.0
+    for row in rows:
+        if not row.count:
+            continue
+        total = count + row.count
+        delta = row.mean_ratio - mean
+        mean += delta * row.count / total
+        m2 += row.m2 + delta * delta * count * row.count / total
+        count = total
+    return count, mean, m2
+
+def get_expected_actual_minutes(user_id, category_id, estimated_minutes):
+    """Expected real duration for an estimate, from the category's (or user's) historical ratio.
+
+    Returns a dict with ``expected_minutes``, ``low_minutes``/``high_minutes`` (one standard
+    deviation either side), the ``ratio`` used, its ``samples`` and ``basis``
+    ('category', 'user' or 'none' when there is no history yet).
+    """
+    rows = EstimationStats.query.filter_by(user_id=user_id).all()
+    category_row = next((row for row in rows if row.category_id == category_id), None)
+    if category_row is not None and category_row.count >= MIN_SAMPLES:
+        count, mean, m2, basis = category_row.count, category_row.mean_ratio, category_row.m2, 'category'
+    else:
+        count, mean, m2 = _combine(rows)
+        basis = 'user'
+    if count < MIN_SAMPLES:
+        mean, m2, basis = 1.0, 0.0, 'none'
+
+    stddev = math.sqrt(m2 / (count - 1)) if count > 1 else 0.0
+    return {
+        'estimated_minutes': estimated_minutes,
+        'expected_minutes': round(estimated_minutes * mean),
+        'low_minutes': round(estimated_minutes * max(mean - stddev, 0)),
+        'high_minutes': round(estimated_minutes * (mean + stddev)),
+        'ratio': round(mean, 3),
+        'samples': count,
+        'basis': basis
+    }
+
+def get_estimation_accuracy_from_stats(user_id):
+    """100 minus the mean relative estimation error, from the stored statistics in one query"""
+    count, abs_error_sum = db.session.query(
+        func.coalesce(func.sum(EstimationStats.count), 0),
+        func.coalesce(func.sum(EstimationStats.abs_error_sum), 0.0)
+    ).filter(EstimationStats.user_id == user_id).one()
+    return (1 - abs_error_sum / count) * 100 if count else 0
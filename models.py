@@ -2,7 +2,7 @@ from datetime import datetime
 import secrets
 from flask_login import UserMixin
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import Index
+from sqlalchemy import Index, func
 
 db = SQLAlchemy()
 
@@ -26,6 +26,13 @@ class User(UserMixin, db.Model):
     # Work hour goals
     weekly_work_goal = db.Column(db.Float, default=32.0)  # Weekly work hour goal
     monthly_work_goal = db.Column(db.Float, default=140.0)  # Monthly work hour goal
+    tracked_categories = db.Column(db.JSON, nullable=True)  # Category names shown in work hour progress
+    
+    # Bumped on every write to the user's plans, tasks or categories; keys cached analytics
+    data_version = db.Column(db.Integer, default=0, nullable=False, server_default='0')
+    
+    # Last value handed out to Task.change_seq / TaskTombstone.change_seq; the task change feed's cursor
+    task_change_seq = db.Column(db.Integer, default=0, nullable=False, server_default='0')
     
     # Admin privileges
     is_admin = db.Column(db.Boolean, default=False, index=True)  # Admin flag
@@ -86,6 +93,20 @@ class Category(db.Model):
     tasks = db.relationship('Task', backref='category', lazy=True)
     color = db.Column(db.String(7), default='#6c757d')
 
+# Bootstrap color classes for task status and priority badges
+TASK_STATUS_COLORS = {
+    'pending': 'secondary',
+    'in_progress': 'primary',
+    'completed': 'success',
+    'blocked': 'danger'
+}
+TASK_PRIORITY_COLORS = {
+    'low': 'success',
+    'medium': 'warning',
+    'high': 'orange',
+    'urgent': 'danger'
+}
+
 class Task(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False, index=True)
@@ -121,6 +142,9 @@ class Task(db.Model):
     parent_task_id = db.Column(db.Integer, db.ForeignKey('task.id'), nullable=True)
     subtasks = db.relationship('Task', backref=db.backref('parent_task', remote_side=[id]), lazy=True)
     
+    # User.task_change_seq at the task's last change, for GET /api/tasks/changes
+    change_seq = db.Column(db.Integer, default=0, nullable=False, server_default='0')
+    
     # Add buffer time for time blocks
     buffer_minutes = db.Column(db.Integer, default=0)
     
@@ -131,19 +155,13 @@ class Task(db.Model):
     estimated_vs_actual_ratio = db.Column(db.Float, nullable=True)
     completion_rate = db.Column(db.Float, nullable=True)
     
+    # Time block counters, maintained on every plan save (repair with check_task_counters.py)
+    tracked_minutes = db.Column(db.Integer, default=0, nullable=False, server_default='0')  # All scheduled blocks
+    completed_minutes = db.Column(db.Integer, default=0, nullable=False, server_default='0')  # Completed blocks only
+    
     def get_total_time_spent(self):
-        """Calculate total time spent on this task from time blocks"""
-        from sqlalchemy.orm import Session
-        total_minutes = 0
-        # Use db.session to query time blocks for this task
-        blocks = db.session.query(TimeBlock).filter(
-            TimeBlock.task_id == self.id, 
-            TimeBlock.completed == True
-        ).all()
-        for block in blocks:
-            # Each time block represents 15 minutes
-            total_minutes += 15
-        return total_minutes
+        """Total time spent on this task, from the maintained completed-block counter"""
+        return self.completed_minutes or 0
     
     def update_analytics(self):
         """Update task analytics"""
@@ -157,23 +175,11 @@ class Task(db.Model):
     
     def get_status_color(self):
         """Return Bootstrap color class for task status"""
-        status_colors = {
-            'pending': 'secondary',
-            'in_progress': 'primary',
-            'completed': 'success',
-            'blocked': 'danger'
-        }
-        return status_colors.get(self.status, 'secondary')
+        return TASK_STATUS_COLORS.get(self.status, 'secondary')
     
     def get_priority_color(self):
         """Return Bootstrap color class for task priority"""
-        priority_colors = {
-            'low': 'success',
-            'medium': 'warning',
-            'high': 'orange',
-            'urgent': 'danger'
-        }
-        return priority_colors.get(self.priority, 'warning')
+        return TASK_PRIORITY_COLORS.get(self.priority, 'warning')
     
     def is_overdue(self):
         """Check if task is overdue"""
@@ -196,6 +202,14 @@ class TaskComment(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     task = db.relationship('Task', backref=db.backref('comments', lazy=True))
 
+class TaskTombstone(db.Model):
+    """A deleted task, kept so the change feed can tell clients to drop it"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    task_id = db.Column(db.Integer, nullable=False)
+    change_seq = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow)
+
 class TaskAttachment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     task_id = db.Column(db.Integer, db.ForeignKey('task.id'), nullable=False)
@@ -214,10 +228,71 @@ class DayTemplate(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     user = db.relationship('User', backref=db.backref('templates', lazy=True))
 
+class DailyCategoryRollup(db.Model):
+    """Per-day minutes by category, maintained on write so stats don't rescan time blocks"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=True)  # NULL row holds the day's PTO
+    planned_minutes = db.Column(db.Integer, default=0, nullable=False)
+    completed_minutes = db.Column(db.Integer, default=0, nullable=False)
+    pto_minutes = db.Column(db.Float, default=0.0, nullable=False)
+
+class PeriodCategoryRollup(db.Model):
+    """ISO week and calendar month totals by category, rebuilt from the daily rollups they cover"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    period = db.Column(db.String(5), nullable=False)  # 'week' (starts Monday) or 'month'
+    period_start = db.Column(db.Date, nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=True)  # NULL row holds PTO
+    planned_minutes = db.Column(db.Integer, default=0, nullable=False)
+    completed_minutes = db.Column(db.Integer, default=0, nullable=False)
+    pto_minutes = db.Column(db.Float, default=0.0, nullable=False)
+    active_days = db.Column(db.Integer, default=0, nullable=False)  # Days with any planned minutes
+
+class EstimationStats(db.Model):
+    """Running statistics of actual/estimated minutes for a user's completed tasks in one category"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=False)
+    count = db.Column(db.Integer, default=0, nullable=False)
+    mean_ratio = db.Column(db.Float, default=0.0, nullable=False)
+    m2 = db.Column(db.Float, default=0.0, nullable=False)  # Sum of squared deviations from the mean (Welford)
+    abs_error_sum = db.Column(db.Float, default=0.0, nullable=False)  # Sum of |ratio - 1|
+    __table_args__ = (db.UniqueConstraint('user_id', 'category_id', name='uq_estimation_stats_user_category'),)
+
+class ProductiveHourCount(db.Model):
+    """Completed time blocks of a user's completed tasks that start in one hour of the day"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    hour = db.Column(db.Integer, nullable=False)  # 0-23
+    completed_blocks = db.Column(db.Integer, default=0, nullable=False)
+    __table_args__ = (db.UniqueConstraint('user_id', 'hour', name='uq_productive_hour_user_hour'),)
+
+class WindowStatsSnapshot(db.Model):
+    """Category and task totals for a trailing window of days, precomputed through a given date"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    window_days = db.Column(db.Integer, nullable=False)
+    through_date = db.Column(db.Date, nullable=False)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    category_totals = db.Column(db.JSON)  # [[category_id or null, planned, completed, pto, days], ...]
+    task_totals = db.Column(db.JSON)  # [[task_id, planned, completed], ...]
+    __table_args__ = (db.UniqueConstraint('user_id', 'window_days', 'through_date', name='uq_window_stats_user_window'),)
+
 # Add indexes for frequently queried fields
 Index('idx_daily_plan_user_date', DailyPlan.user_id, DailyPlan.date)
 Index('idx_task_user_completed', Task.user_id, Task.completed)
 Index('idx_task_user_due_date', Task.user_id, Task.due_date)
+Index('idx_task_user_created', Task.user_id, Task.created_at, Task.id)
+Index('idx_task_user_change_seq', Task.user_id, Task.change_seq)
+Index('idx_task_tombstone_user_change_seq', TaskTombstone.user_id, TaskTombstone.change_seq)
 Index('idx_timeblock_daily_plan', TimeBlock.daily_plan_id)
+Index('idx_timeblock_task', TimeBlock.task_id)
 Index('idx_task_category', Task.category_id)
-Index('idx_task_role', Task.role_id)
\ No newline at end of file
+Index('idx_task_role', Task.role_id)
+# One rollup row per day (or period) and category, with the NULL-category PTO row counted as category 0
+Index('uq_rollup_user_date_category', DailyCategoryRollup.user_id, DailyCategoryRollup.date,
+      func.coalesce(DailyCategoryRollup.category_id, 0), unique=True)
+Index('uq_period_rollup_user_period_category', PeriodCategoryRollup.user_id, PeriodCategoryRollup.period,
+      PeriodCategoryRollup.period_start, func.coalesce(PeriodCategoryRollup.category_id, 0), unique=True)
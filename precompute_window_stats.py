@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Window Stats Precompute Job for TimeBlocker
+
+Stores 30/180/365-day category and task totals through yesterday (Pacific) for
+every active user, so requests only add today's live delta. Schedule it nightly
+shortly after midnight Pacific (e.g. a Render/Railway cron job running
+`python precompute_window_stats.py`). Snapshots invalidated by writes to past
+days are rebuilt on the next request, or by re-running this job.
+
+Usage: python precompute_window_stats.py [user_id ...]
+"""
+
+import sys
+import logging
+from datetime import datetime, timedelta
+
+import pytz
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Users with a plan dated within this many days count as active
+ACTIVE_DAYS = 30
+
+def precompute_window_stats(user_ids=None):
+    """Precompute window snapshots for the given users, or for every active user"""
+    from app import app, db
+    from models import DailyPlan
+    from window_stats import PRECOMPUTED_WINDOWS, store_window_snapshot
+
+    with app.app_context():
+        # Make sure the snapshot table exists on databases created before it was added
+        db.create_all()
+
+        yesterday = datetime.now(pytz.timezone('America/Los_Angeles')).date() - timedelta(days=1)
+        if not user_ids:
+            user_ids = [user_id for (user_id,) in db.session.query(DailyPlan.user_id).filter(
+                DailyPlan.date >= yesterday - timedelta(days=ACTIVE_DAYS)
+            ).distinct().order_by(DailyPlan.user_id).all()]
+
+        failures = 0
+        for user_id in user_ids:
+            try:
+                for window_days in PRECOMPUTED_WINDOWS:
+                    store_window_snapshot(user_id, window_days, yesterday)
+                db.session.commit()
+                logger.info(f"✅ Precomputed windows through {yesterday} for user {user_id}")
+            except Exception as e:
+                db.session.rollback()
+                failures += 1
+                logger.error(f"❌ Failed to precompute windows for user {user_id}: {str(e)}")
+
+        logger.info(f"🎉 Precomputed window stats for {len(user_ids) - failures} of {len(user_ids)} users")
+        return failures == 0
+
+if __name__ == "__main__":
+    requested_ids = [int(arg) for arg in sys.argv[1:]]
+    sys.exit(0 if precompute_window_stats(requested_ids) else 1)
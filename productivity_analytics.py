@@ -0,0 +1,262 @@
+from datetime import timedelta
+from sqlalchemy import case, extract, func
+from models import db, Category, DailyCategoryRollup, DailyPlan, TimeBlock, Task
+from time_stats import BLOCK_MINUTES
+from rollups import get_category_rollup_totals, get_period_breakdown, get_period_start, get_period_end
+from task_analytics import get_productive_hours, get_estimation_accuracy
+
+WEEKDAY_NAMES = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+HEATMAP_SLOT_MINUTES = (15, 30, 60, 120)
+
+# Trend resolution by range length: daily under 90 days, weekly under two years, monthly beyond
+TREND_DAILY_MAX_DAYS = 90
+TREND_WEEKLY_MAX_DAYS = 730
+
+def get_daily_minutes(user_id, start_date, end_date):
+    """Planned and completed minutes per scheduled day from the daily rollups, as {date: (planned, completed)}"""
+    rows = db.session.query(
+        DailyCategoryRollup.date,
+        func.sum(DailyCategoryRollup.planned_minutes),
+        func.sum(DailyCategoryRollup.completed_minutes)
+    ).filter(
+        DailyCategoryRollup.user_id == user_id,
+        DailyCategoryRollup.date.between(start_date, end_date),
+        DailyCategoryRollup.category_id.isnot(None)
+    ).group_by(DailyCategoryRollup.date).all()
+    return {day: (int(planned or 0), int(completed or 0)) for day, planned, completed in rows}
+
+def _category_hours(user_id, totals):
+    categories = Category.query.filter_by(user_id=user_id).all()
+    rows = []
+    for category in categories:
+        minutes = totals.get(category.id, {}).get('planned_minutes', 0)
+        if minutes:
+            rows.append({
+                'id': category.id,
+                'name': category.name,
+                'color': category.color,
+                'hours': round(minutes / 60, 1),
+                'completed_hours': round(totals[category.id]['completed_minutes'] / 60, 1)
+            })
+    rows.sort(key=lambda row: row['hours'], reverse=True)
+    return rows
+
+def get_productivity_analytics(user_id, start_date, end_date, category_totals=None):
+    """Metrics and chart series for the analytics page over an inclusive date range.
+
+    ``category_totals`` may pass in precomputed per-category totals for the range.
+    """
+    totals = category_totals if category_totals is not None else get_category_rollup_totals(user_id, start_date, end_date)
+    daily_minutes = get_daily_minutes(user_id, start_date, end_date)
+
+    planned = sum(t['planned_minutes'] for category_id, t in totals.items() if category_id is not None)
+    completed = sum(t['completed_minutes'] for category_id, t in totals.items() if category_id is not None)
+
+    # Focus score: average share of scheduled time completed on days that had a plan, out of 10
+    day_rates = [done / scheduled for scheduled, done in daily_minutes.values() if scheduled]
+    focus_score = round(sum(day_rates) / len(day_rates) * 10, 1) if day_rates else 0
+
+    # Average scheduled hours for each weekday across every calendar day in the range
+    weekday_minutes = [0] * 7
+    weekday_days = [0] * 7
+    num_days = (end_date - start_date).days + 1
+    for offset in range(min(num_days, 7)):
+        weekday = (start_date + timedelta(days=offset)).weekday()
+        weekday_days[weekday] = (num_days - offset + 6) // 7
+    for day, (scheduled, _) in daily_minutes.items():
+        weekday_minutes[day.weekday()] += scheduled
+
+    productive_hours = get_productive_hours(user_id)
+
+    return {
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'metrics': {
+            'total_hours': round(planned / 60, 1),
+            'completed_hours': round(completed / 60, 1),
+            'completion_rate': round(completed / planned * 100, 1) if planned else 0,
+            'avg_focus_score': focus_score,
+            'estimation_accuracy': round(get_estimation_accuracy(user_id), 1)
+        },
+        'categories': _category_hours(user_id, totals),
+        'hourly': [
+            {'hour': hour, 'score': round(score * 100)}
+            for hour, score in sorted(productive_hours.items())
+        ],
+        'daily': [
+            {
+                'date': WEEKDAY_NAMES[weekday],
+                'hours': round(weekday_minutes[weekday] / weekday_days[weekday] / 60, 2) if weekday_days[weekday] else 0
+            }
+            for weekday in range(7)
+        ]
+    }
+
+def get_productivity_insight_messages(user_id, today, days=30):
+    """Short plain-text observations comparing the last ``days`` days with the ``days`` before"""
+    current_start = today - timedelta(days=days - 1)
+    previous_start = current_start - timedelta(days=days)
+    current = get_category_rollup_totals(user_id, current_start, today)
+    previous = get_category_rollup_totals(user_id, previous_start, current_start - timedelta(days=1))
+
+    def completion(totals):
+        planned = sum(t['planned_minutes'] for category_id, t in totals.items() if category_id is not None)
+        completed = sum(t['completed_minutes'] for category_id, t in totals.items() if category_id is not None)
+        return planned, (completed / planned * 100) if planned else None
+
+    messages = []
+    planned, rate = completion(current)
+    _, previous_rate = completion(previous)
+    if rate is None:
+        messages.append(f"No time blocks scheduled in the last {days} days. Plan a few days to start seeing insights.")
+        return messages
+
+    message = f"You completed {rate:.0f}% of the {planned / 60:.1f} hours you scheduled in the last {days} days"
+    if previous_rate is not None:
+        change = rate - previous_rate
+        direction = 'up' if change >= 0 else 'down'
+        message += f", {direction} {abs(change):.0f} points from the {days} days before"
+    messages.append(message + '.')
+
+    categories = _category_hours(user_id, current)
+    if categories:
+        top = categories[0]
+        messages.append(f"Most of your scheduled time went to {top['name']} ({top['hours']} hours).")
+        lagging = [c for c in categories if c['hours'] and c['completed_hours'] / c['hours'] < 0.5]
+        if lagging:
+            names = ', '.join(c['name'] for c in lagging)
+            messages.append(f"Less than half of the time scheduled for {names} was completed. Consider smaller blocks.")
+
+    productive_hours = get_productive_hours(user_id)
+    if productive_hours:
+        best_hour = max(productive_hours.items(), key=lambda item: item[1])[0]
+        messages.append(f"You complete the most blocks around {best_hour}:00. Schedule demanding work then.")
+
+    pto_minutes = current.get(None, {}).get('pto_minutes', 0)
+    if pto_minutes:
+        messages.append(f"You logged {pto_minutes / 60:.1f} hours of PTO in the last {days} days.")
+
+    return messages
+
+def get_weekday_heatmap(user_id, start_date, end_date, slot_minutes=60, category_id=None):
+    """Planned and completed minutes as 7 weekday rows (Monday first) by time-of-day slot.
+
+    One grouped query returns at most 7 x 96 rows of 15-minute cells, which are then
+    folded into ``slot_minutes``-wide columns; no per-block rows reach Python.
+    """
+    weekday = extract('dow', DailyPlan.date)
+    hour = extract('hour', TimeBlock.start_time)
+    minute = extract('minute', TimeBlock.start_time)
+    query = db.session.query(
+        weekday,
+        hour,
+        minute,
+        func.count(TimeBlock.id),
+        func.sum(case((TimeBlock.completed == True, 1), else_=0))
+    ).select_from(TimeBlock).join(
+        DailyPlan, TimeBlock.daily_plan_id == DailyPlan.id
+    ).join(
+        Task, TimeBlock.task_id == Task.id
+    ).filter(
+        DailyPlan.user_id == user_id,
+        DailyPlan.date.between(start_date, end_date)
+    )
+    if category_id is not None:
+        query = query.filter(Task.category_id == category_id)
+
+    slots_per_day = 24 * 60 // slot_minutes
+    planned = [[0] * slots_per_day for _ in range(7)]
+    completed = [[0] * slots_per_day for _ in range(7)]
+    for dow, block_hour, block_minute, blocks, done in query.group_by(weekday, hour, minute).all():
+        row = (int(dow) + 6) % 7  # dow counts from Sunday = 0
+        column = (int(block_hour) * 60 + int(block_minute)) // slot_minutes
+        planned[row][column] += int(blocks) * BLOCK_MINUTES
+        completed[row][column] += int(done or 0) * BLOCK_MINUTES
+
+    return {
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'category_id': category_id,
+        'slot_minutes': slot_minutes,
+        'weekdays': WEEKDAY_NAMES,
+        'slots': [f"{(i * slot_minutes) // 60:02d}:{(i * slot_minutes) % 60:02d}" for i in range(slots_per_day)],
+        'planned_minutes': planned,
+        'completed_minutes': completed
+    }
+
+def get_trend_resolution(num_days):
+    """'day', 'week' or 'month' depending on how long the range is"""
+    if num_days < TREND_DAILY_MAX_DAYS:
+        return 'day'
+    if num_days < TREND_WEEKLY_MAX_DAYS:
+        return 'week'
+    return 'month'
+
+def get_trend_series(user_id, start_date, end_date):
+    """Per-category planned and completed hours over time at an automatic resolution.
+
+    Daily points come from the daily rollups, weekly and monthly points from the
+    period tiers, so rows read and points returned track the number of buckets
+    (at most 89 days or 105 weeks; 12 a year beyond that), not the number of days.
+    """
+    resolution = get_trend_resolution((end_date - start_date).days + 1)
+
+    if resolution == 'day':
+        buckets = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+        breakdown = {}
+        rows = db.session.query(
+            DailyCategoryRollup.date,
+            DailyCategoryRollup.category_id,
+            DailyCategoryRollup.planned_minutes,
+            DailyCategoryRollup.completed_minutes,
+            DailyCategoryRollup.pto_minutes
+        ).filter(
+            DailyCategoryRollup.user_id == user_id,
+            DailyCategoryRollup.date.between(start_date, end_date)
+        ).all()
+        for day, category_id, planned, completed, pto in rows:
+            breakdown.setdefault(day, {})[category_id] = {
+                'planned_minutes': planned, 'completed_minutes': completed, 'pto_minutes': pto
+            }
+    else:
+        buckets = []
+        bucket = get_period_start(start_date, resolution)
+        while bucket <= end_date:
+            buckets.append(bucket)
+            bucket = get_period_end(bucket, resolution) + timedelta(days=1)
+        breakdown = get_period_breakdown(user_id, start_date, end_date, resolution)
+
+    index = {bucket: i for i, bucket in enumerate(buckets)}
+    planned = {}
+    completed = {}
+    pto = [0.0] * len(buckets)
+    for bucket, categories in breakdown.items():
+        i = index[bucket]
+        for category_id, totals in categories.items():
+            if category_id is None:
+                pto[i] += totals['pto_minutes'] or 0
+                continue
+            planned.setdefault(category_id, [0] * len(buckets))[i] += totals['planned_minutes'] or 0
+            completed.setdefault(category_id, [0] * len(buckets))[i] += totals['completed_minutes'] or 0
+
+    categories = {c.id: c for c in Category.query.filter_by(user_id=user_id).all()}
+    series = [
+        {
+            'category_id': category_id,
+            'name': categories[category_id].name,
+            'color': categories[category_id].color,
+            'planned_hours': [round(minutes / 60, 2) for minutes in planned[category_id]],
+            'completed_hours': [round(minutes / 60, 2) for minutes in completed[category_id]]
+        }
+        for category_id in sorted(planned, key=lambda cid: sum(planned[cid]), reverse=True)
+        if category_id in categories
+    ]
+
+    return {
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'resolution': resolution,
+        'buckets': [bucket.isoformat() for bucket in buckets],
+        'series': series,
+        'pto_hours': [round(minutes / 60, 2) for minutes in pto]
+    }
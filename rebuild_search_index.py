@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Search Index Rebuild Script for TimeBlocker
+
+Indexes existing tasks, task comments and daily plans (priorities and brain dump)
+for /api/search. New writes keep the index current; run this once after deploying
+search, or to repair a user's index. Safe to re-run: each user's documents are
+rebuilt from scratch.
+
+Usage: python rebuild_search_index.py [user_id ...]
+"""
+
+import sys
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def rebuild_search_indexes(user_ids=None):
+    """Rebuild the search index for the given users, or for every user when none are given"""
+    from app import app, db
+    from models import User
+    from search_index import rebuild_search_index
+
+    with app.app_context():
+        # Make sure the search table exists on databases created before it was added
+        db.create_all()
+
+        if not user_ids:
+            user_ids = [user_id for (user_id,) in db.session.query(User.id).order_by(User.id).all()]
+
+        for user_id in user_ids:
+            try:
+                documents = rebuild_search_index(user_id)
+                db.session.commit()
+                logger.info(f"✅ Indexed {documents} documents for user {user_id}")
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"❌ Failed to index user {user_id}: {str(e)}")
+                return False
+
+        logger.info(f"🎉 Rebuilt search index for {len(user_ids)} users")
+        return True
+
+if __name__ == "__main__":
+    requested_ids = [int(arg) for arg in sys.argv[1:]]
+    sys.exit(0 if rebuild_search_indexes(requested_ids) else 1)
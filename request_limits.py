@@ -0,0 +1,100 @@
+"""Guardrails that keep one report request from tying up a worker or a pooled connection.
+
+Range parameters are parsed and bounded in one place, endpoints that scan raw time
+blocks check an up-front cost estimate from the daily rollups, and report endpoints
+run their queries under a Postgres statement timeout well inside the worker timeout.
+"""
+import logging
+from functools import wraps
+
+from flask import jsonify
+from sqlalchemy import func, text
+from sqlalchemy.exc import OperationalError
+
+from models import db, DailyCategoryRollup
+from time_stats import BLOCK_MINUTES
+
+logger = logging.getLogger(__name__)
+
+# Longest date range any report accepts (ten years)
+MAX_RANGE_DAYS = 3660
+
+# Most time blocks a single request may scan row by row
+MAX_SCANNED_BLOCKS = 250000
+
+# Statement timeouts in milliseconds; gunicorn kills sync workers after 60 seconds
+REPORT_STATEMENT_TIMEOUT_MS = 15000
+ADMIN_STATEMENT_TIMEOUT_MS = 30000
+
+# Postgres SQLSTATE for a statement cancelled by statement_timeout
+QUERY_CANCELED = '57014'
+
+class RangeLimitError(ValueError):
+    """A range parameter that is malformed, out of bounds or too expensive to serve"""
+
+def parse_range_days(value, default, max_days=MAX_RANGE_DAYS, allow_all=False, clamp=False):
+    """Parse a ?days=/?period= value into a whole number of days between 1 and ``max_days``.
+
+    Returns 'all' when ``allow_all`` is set and the value is 'all'. With ``clamp``
+    a malformed value falls back to ``default`` and an out-of-range one is clamped;
+    otherwise both raise RangeLimitError.
+    """
+    if value is None or value == '':
+        return default
+    if allow_all and value == 'all':
+        return 'all'
+    try:
+        days = int(value)
+    except (TypeError, ValueError):
+        if clamp:
+            return default
+        raise RangeLimitError('days must be a whole number' + (' or "all"' if allow_all else ''))
+    if 1 <= days <= max_days:
+        return days
+    if clamp:
+        return min(max(days, 1), max_days)
+    raise RangeLimitError(f'days must be between 1 and {max_days}')
+
+def estimate_block_rows(user_id, start_date, end_date):
+    """Estimated time blocks scheduled in a range, read from the daily rollups instead of the blocks"""
+    planned_minutes = db.session.query(
+        func.coalesce(func.sum(DailyCategoryRollup.planned_minutes), 0)
+    ).filter(
+        DailyCategoryRollup.user_id == user_id,
+        DailyCategoryRollup.date.between(start_date, end_date)
+    ).scalar()
+    return int(planned_minutes) // BLOCK_MINUTES
+
+def check_range_cost(user_id, start_date, end_date, max_blocks=MAX_SCANNED_BLOCKS):
+    """Raise RangeLimitError when a range would scan more than ``max_blocks`` time blocks"""
+    estimated = estimate_block_rows(user_id, start_date, end_date)
+    if estimated > max_blocks:
+        logger.warning(f"Rejected range {start_date}..{end_date} for user {user_id}: ~{estimated} blocks")
+        raise RangeLimitError('This date range holds too much data to analyze at once; choose a shorter range')
+    return estimated
+
+def set_statement_timeout(timeout_ms):
+    """Cap every statement in the current transaction at ``timeout_ms`` (Postgres only)"""
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(text(f"SET LOCAL statement_timeout = {int(timeout_ms)}"))
+
+def statement_timeout(timeout_ms=REPORT_STATEMENT_TIMEOUT_MS):
+    """Run a view's queries under a statement timeout and answer 503 when one is cancelled.
+
+    SET LOCAL lasts until the transaction ends, so the setting never leaks into the
+    pooled connection's next request.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            set_statement_timeout(timeout_ms)
+            try:
+                return f(*args, **kwargs)
+            except OperationalError as e:
+                if getattr(e.orig, 'pgcode', None) != QUERY_CANCELED:
+                    raise
+                db.session.rollback()
+                logger.warning(f"Statement timeout ({timeout_ms} ms) in {f.__name__}")
+                return jsonify({'error': 'This request took too long; try a shorter date range'}), 503
+        return decorated_function
+    return decorator
@@ -0,0 +1,321 @@
+from datetime import timedelta
+from sqlalchemy import case, func, insert, or_, and_
+from models import db, DailyPlan, TimeBlock, Task, DailyCategoryRollup, PeriodCategoryRollup, WindowStatsSnapshot
+from time_stats import BLOCK_MINUTES
+
+ROLLUP_PERIODS = ('week', 'month')
+
+def get_period_start(day, period):
+    """First day of the ISO week (Monday) or calendar month containing ``day``."""
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+def get_period_end(start, period):
+    """Last day of the week or month beginning on ``start``."""
+    if period == 'week':
+        return start + timedelta(days=6)
+    next_month = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return next_month - timedelta(days=1)
+
+def _empty_totals():
+    return {'planned_minutes': 0, 'completed_minutes': 0, 'pto_minutes': 0.0, 'active_days': 0}
+
+def _add_daily_row(totals, planned, completed, pto):
+    totals['planned_minutes'] += planned or 0
+    totals['completed_minutes'] += completed or 0
+    totals['pto_minutes'] += pto or 0
+    if planned:
+        totals['active_days'] += 1
+
+def refresh_daily_rollups(user_id, dates=None):
+    """Recompute the user's per-day category rollups from raw time blocks.
+
+    Only the given dates are rebuilt; ``dates=None`` rebuilds the user's whole history.
+    Runs inside the caller's transaction, so call it after the plan changes are
+    added and before the commit.
+    """
+    if dates is not None:
+        dates = set(dates)
+        if not dates:
+            return
+
+    block_query = db.session.query(
+        DailyPlan.date,
+        Task.category_id,
+        func.count(TimeBlock.id) * BLOCK_MINUTES,
+        func.sum(case((TimeBlock.completed == True, BLOCK_MINUTES), else_=0))
+    ).select_from(TimeBlock).join(
+        DailyPlan, TimeBlock.daily_plan_id == DailyPlan.id
+    ).join(
+        Task, TimeBlock.task_id == Task.id
+    ).filter(
+        DailyPlan.user_id == user_id
+    ).group_by(DailyPlan.date, Task.category_id)
+
+    pto_query = db.session.query(
+        DailyPlan.date,
+        func.sum(DailyPlan.pto_hours) * 60
+    ).filter(
+        DailyPlan.user_id == user_id,
+        DailyPlan.pto_hours > 0
+    ).group_by(DailyPlan.date)
+
+    stale_query = DailyCategoryRollup.query.filter(DailyCategoryRollup.user_id == user_id)
+
+    if dates is not None:
+        block_query = block_query.filter(DailyPlan.date.in_(dates))
+        pto_query = pto_query.filter(DailyPlan.date.in_(dates))
+        stale_query = stale_query.filter(DailyCategoryRollup.date.in_(dates))
+
+    rows = [{
+        'user_id': user_id,
+        'date': plan_date,
+        'category_id': category_id,
+        'planned_minutes': int(planned or 0),
+        'completed_minutes': int(completed or 0),
+        'pto_minutes': 0.0
+    } for plan_date, category_id, planned, completed in block_query.all()]
+    rows.extend({
+        'user_id': user_id,
+        'date': plan_date,
+        'category_id': None,
+        'planned_minutes': 0,
+        'completed_minutes': 0,
+        'pto_minutes': float(pto_minutes)
+    } for plan_date, pto_minutes in pto_query.all())
+
+    stale_query.delete(synchronize_session=False)
+    if rows:
+        db.session.execute(insert(DailyCategoryRollup), rows)
+
+    refresh_period_rollups(user_id, dates)
+    invalidate_window_snapshots(user_id, dates)
+
+def invalidate_window_snapshots(user_id, dates=None):
+    """Drop precomputed window totals that may include any of ``dates`` (all of them for None)."""
+    query = WindowStatsSnapshot.query.filter(WindowStatsSnapshot.user_id == user_id)
+    if dates is not None:
+        query = query.filter(WindowStatsSnapshot.through_date >= min(dates))
+    query.delete(synchronize_session=False)
+
+def refresh_period_rollups(user_id, dates=None):
+    """Rebuild the week and month rollups containing ``dates`` from the daily rollups.
+
+    ``dates=None`` rebuilds every period for the user.
+    """
+    daily_query = db.session.query(
+        DailyCategoryRollup.date,
+        DailyCategoryRollup.category_id,
+        DailyCategoryRollup.planned_minutes,
+        DailyCategoryRollup.completed_minutes,
+        DailyCategoryRollup.pto_minutes
+    ).filter(DailyCategoryRollup.user_id == user_id)
+    stale_query = PeriodCategoryRollup.query.filter(PeriodCategoryRollup.user_id == user_id)
+
+    affected = None
+    if dates is not None:
+        affected = {(period, get_period_start(day, period)) for day in dates for period in ROLLUP_PERIODS}
+        daily_query = daily_query.filter(or_(*[
+            DailyCategoryRollup.date.between(start, get_period_end(start, period))
+            for period, start in affected
+        ]))
+        stale_query = stale_query.filter(or_(*[
+            and_(PeriodCategoryRollup.period == period, PeriodCategoryRollup.period_start == start)
+            for period, start in affected
+        ]))
+
+    period_totals = {}
+    for day, category_id, planned, completed, pto in daily_query.all():
+        for period in ROLLUP_PERIODS:
+            start = get_period_start(day, period)
+            if affected is not None and (period, start) not in affected:
+                continue
+            key = (period, start, category_id)
+            if key not in period_totals:
+                period_totals[key] = _empty_totals()
+            _add_daily_row(period_totals[key], planned, completed, pto)
+
+    stale_query.delete(synchronize_session=False)
+    if period_totals:
+        db.session.execute(insert(PeriodCategoryRollup), [{
+            'user_id': user_id,
+            'period': period,
+            'period_start': start,
+            'category_id': category_id,
+            **totals
+        } for (period, start, category_id), totals in period_totals.items()])
+
+def get_scheduled_dates(task_ids):
+    """Dates on which any of the tasks occupy a time block.
+
+    Capture these before deleting or re-categorizing tasks, then pass them to
+    ``refresh_daily_rollups`` once the change is flushed.
+    """
+    task_ids = list(task_ids)
+    if not task_ids:
+        return set()
+    return {plan_date for (plan_date,) in db.session.query(DailyPlan.date).join(
+        TimeBlock, TimeBlock.daily_plan_id == DailyPlan.id
+    ).filter(TimeBlock.task_id.in_(task_ids)).distinct().all()}
+
+def get_category_rollup_totals(user_id, start_date, end_date):
+    """Planned, completed and PTO minutes per category id (None = PTO) between two dates."""
+    rows = db.session.query(
+        DailyCategoryRollup.category_id,
+        func.sum(DailyCategoryRollup.planned_minutes),
+        func.sum(DailyCategoryRollup.completed_minutes),
+        func.sum(DailyCategoryRollup.pto_minutes),
+        func.count(DailyCategoryRollup.id)
+    ).filter(
+        DailyCategoryRollup.user_id == user_id,
+        DailyCategoryRollup.date.between(start_date, end_date)
+    ).group_by(DailyCategoryRollup.category_id).all()
+
+    return {
+        category_id: {
+            'planned_minutes': int(planned or 0),
+            'completed_minutes': int(completed or 0),
+            'pto_minutes': float(pto or 0),
+            'days': days
+        }
+        for category_id, planned, completed, pto, days in rows
+    }
+
+def get_period_breakdown(user_id, start_date, end_date, period):
+    """Totals per category for each week or month overlapping ``start_date``..``end_date``.
+
+    Periods that lie fully inside the range are read from the pre-aggregated tier;
+    only the partial periods at either edge fall back to daily rollup rows, so the
+    number of rows read grows with the number of periods, not the number of days.
+    Returns ``{period_start: {category_id: totals}}`` where ``category_id`` None is PTO.
+    """
+    first_full = get_period_start(start_date, period)
+    if first_full < start_date:
+        first_full = get_period_end(first_full, period) + timedelta(days=1)
+    last_full = get_period_start(end_date, period)
+    if get_period_end(last_full, period) > end_date:
+        last_full = last_full - timedelta(days=1)
+        last_full = get_period_start(last_full, period)
+    has_full = first_full <= last_full
+
+    breakdown = {}
+
+    if has_full:
+        tier_rows = db.session.query(
+            PeriodCategoryRollup.period_start,
+            PeriodCategoryRollup.category_id,
+            PeriodCategoryRollup.planned_minutes,
+            PeriodCategoryRollup.completed_minutes,
+            PeriodCategoryRollup.pto_minutes,
+            PeriodCategoryRollup.active_days
+        ).filter(
+            PeriodCategoryRollup.user_id == user_id,
+            PeriodCategoryRollup.period == period,
+            PeriodCategoryRollup.period_start.between(first_full, last_full)
+        ).all()
+        for start, category_id, planned, completed, pto, active_days in tier_rows:
+            breakdown.setdefault(start, {})[category_id] = {
+                'planned_minutes': planned,
+                'completed_minutes': completed,
+                'pto_minutes': pto,
+                'active_days': active_days
+            }
+
+    # Partial periods at the edges come from the daily tier
+    edges = []
+    if not has_full:
+        edges.append((start_date, end_date))
+    else:
+        if start_date < first_full:
+            edges.append((start_date, first_full - timedelta(days=1)))
+        full_end = get_period_end(last_full, period)
+        if full_end < end_date:
+            edges.append((full_end + timedelta(days=1), end_date))
+
+    if edges:
+        daily_rows = db.session.query(
+            DailyCategoryRollup.date,
+            DailyCategoryRollup.category_id,
+            DailyCategoryRollup.planned_minutes,
+            DailyCategoryRollup.completed_minutes,
+            DailyCategoryRollup.pto_minutes
+        ).filter(
+            DailyCategoryRollup.user_id == user_id,
+            or_(*[DailyCategoryRollup.date.between(edge_start, edge_end) for edge_start, edge_end in edges])
+        ).all()
+        for day, category_id, planned, completed, pto in daily_rows:
+            categories = breakdown.setdefault(get_period_start(day, period), {})
+            if category_id not in categories:
+                categories[category_id] = _empty_totals()
+            _add_daily_row(categories[category_id], planned, completed, pto)
+
+    return breakdown
+
+def get_plan_task_minutes(daily_plan_id):
+    """Scheduled and completed minutes per task in one daily plan, as {task_id: (tracked, completed)}."""
+    if daily_plan_id is None:
+        return {}
+    rows = db.session.query(
+        TimeBlock.task_id,
+        func.count(TimeBlock.id) * BLOCK_MINUTES,
+        func.sum(case((TimeBlock.completed == True, BLOCK_MINUTES), else_=0))
+    ).filter(
+        TimeBlock.daily_plan_id == daily_plan_id,
+        TimeBlock.task_id.isnot(None)
+    ).group_by(TimeBlock.task_id).all()
+    return {task_id: (int(tracked or 0), int(completed or 0)) for task_id, tracked, completed in rows}
+
+def apply_task_minute_changes(user_id, before, after):
+    """Shift Task.tracked_minutes/completed_minutes by the difference between two plan snapshots.
+
+    Both arguments come from ``get_plan_task_minutes`` taken before and after the plan's
+    blocks were rewritten. Increments run in SQL inside the caller's transaction, so
+    concurrent saves of different days never overwrite each other's counts; only the
+    user's own tasks are touched. Returns the ids of the tasks whose counters moved.
+    """
+    changed_task_ids = []
+    for task_id in set(before) | set(after):
+        old_tracked, old_completed = before.get(task_id, (0, 0))
+        new_tracked, new_completed = after.get(task_id, (0, 0))
+        if new_tracked == old_tracked and new_completed == old_completed:
+            continue
+        Task.query.filter(Task.id == task_id, Task.user_id == user_id).update({
+            Task.tracked_minutes: func.coalesce(Task.tracked_minutes, 0) + (new_tracked - old_tracked),
+            Task.completed_minutes: func.coalesce(Task.completed_minutes, 0) + (new_completed - old_completed)
+        }, synchronize_session=False)
+        changed_task_ids.append(task_id)
+    return changed_task_ids
+
+def check_task_counters(user_id=None, repair=False):
+    """Compare the Task time counters with a recount from raw time blocks.
+
+    Returns a list of ``(task_id, stored, actual)`` mismatches, where ``stored`` and
+    ``actual`` are ``(tracked, completed)`` pairs. With ``repair=True`` the
+    mismatched counters are overwritten with the recount (caller commits).
+    """
+    actual_query = db.session.query(
+        TimeBlock.task_id,
+        func.count(TimeBlock.id) * BLOCK_MINUTES,
+        func.sum(case((TimeBlock.completed == True, BLOCK_MINUTES), else_=0))
+    ).join(Task, TimeBlock.task_id == Task.id).group_by(TimeBlock.task_id)
+    stored_query = db.session.query(Task.id, Task.tracked_minutes, Task.completed_minutes)
+    if user_id is not None:
+        actual_query = actual_query.filter(Task.user_id == user_id)
+        stored_query = stored_query.filter(Task.user_id == user_id)
+
+    actual = {task_id: (int(tracked or 0), int(completed or 0)) for task_id, tracked, completed in actual_query.all()}
+    mismatches = []
+    for task_id, tracked, completed in stored_query.all():
+        stored = (tracked or 0, completed or 0)
+        expected = actual.get(task_id, (0, 0))
+        if stored != expected:
+            mismatches.append((task_id, stored, expected))
+
+    if repair:
+        for task_id, _, (tracked, completed) in mismatches:
+            Task.query.filter(Task.id == task_id).update({
+                Task.tracked_minutes: tracked,
+                Task.completed_minutes: completed
+            }, synchronize_session=False)
+    return mismatches
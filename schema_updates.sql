@@ -0,0 +1,128 @@
+-- TimeBlocker incremental schema updates
+-- Run these in order against an existing database (db.create_all() only creates missing tables)
+
+-- Per-user tracked categories for the work hour progress panel
+ALTER TABLE users ADD COLUMN IF NOT EXISTS tracked_categories JSON;
+
+-- Per-day category rollups maintained on write (populate with: python backfill_rollups.py)
+CREATE TABLE IF NOT EXISTS daily_category_rollup (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    date DATE NOT NULL,
+    category_id INTEGER REFERENCES category(id),
+    planned_minutes INTEGER NOT NULL DEFAULT 0,
+    completed_minutes INTEGER NOT NULL DEFAULT 0,
+    pto_minutes FLOAT NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_rollup_user_date ON daily_category_rollup(user_id, date);
+
+-- Weekly and monthly category rollups rebuilt from the daily rollups (populate with: python backfill_rollups.py)
+CREATE TABLE IF NOT EXISTS period_category_rollup (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    period VARCHAR(5) NOT NULL,
+    period_start DATE NOT NULL,
+    category_id INTEGER REFERENCES category(id),
+    planned_minutes INTEGER NOT NULL DEFAULT 0,
+    completed_minutes INTEGER NOT NULL DEFAULT 0,
+    pto_minutes FLOAT NOT NULL DEFAULT 0,
+    active_days INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_period_rollup_user_period ON period_category_rollup(user_id, period, period_start);
+
+-- Per-user data version used to invalidate cached analytics on write
+ALTER TABLE users ADD COLUMN IF NOT EXISTS data_version INTEGER NOT NULL DEFAULT 0;
+
+-- Maintained per-task time counters (populate with: python check_task_counters.py --repair)
+ALTER TABLE task ADD COLUMN IF NOT EXISTS tracked_minutes INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE task ADD COLUMN IF NOT EXISTS completed_minutes INTEGER NOT NULL DEFAULT 0;
+CREATE INDEX IF NOT EXISTS idx_timeblock_task ON time_block(task_id);
+
+-- Running estimation-accuracy statistics per user and category (populate with: python backfill_rollups.py)
+CREATE TABLE IF NOT EXISTS estimation_stats (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    category_id INTEGER NOT NULL REFERENCES category(id),
+    count INTEGER NOT NULL DEFAULT 0,
+    mean_ratio FLOAT NOT NULL DEFAULT 0,
+    m2 FLOAT NOT NULL DEFAULT 0,
+    abs_error_sum FLOAT NOT NULL DEFAULT 0,
+    CONSTRAINT uq_estimation_stats_user_category UNIQUE (user_id, category_id)
+);
+
+-- Trailing 30/180/365-day totals precomputed through yesterday (populate with: python precompute_window_stats.py)
+CREATE TABLE IF NOT EXISTS window_stats_snapshot (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    window_days INTEGER NOT NULL,
+    through_date DATE NOT NULL,
+    computed_at TIMESTAMP,
+    category_totals JSON,
+    task_totals JSON,
+    CONSTRAINT uq_window_stats_user_window UNIQUE (user_id, window_days, through_date)
+);
+
+-- Keyset pagination of GET /api/tasks (newest first)
+CREATE INDEX IF NOT EXISTS idx_task_user_created ON task(user_id, created_at, id);
+
+-- Full-text search over tasks, comments and daily plans (populate with: python rebuild_search_index.py)
+CREATE TABLE IF NOT EXISTS search_index (
+    id BIGINT PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    doc_type VARCHAR(20) NOT NULL,
+    doc_id INTEGER NOT NULL,
+    parent_id INTEGER,
+    doc_date DATE,
+    title TEXT,
+    body TEXT,
+    search_vector TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', translate(coalesce(title, ''), '<>', '  ')), 'A') ||
+        setweight(to_tsvector('english', translate(coalesce(body, ''), '<>', '  ')), 'B')
+    ) STORED
+);
+CREATE INDEX IF NOT EXISTS idx_search_index_vector ON search_index USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_search_index_user ON search_index (user_id);
+
+-- Task change feed (GET /api/tasks/changes): per-user change sequence, stamped tasks and deletion tombstones
+ALTER TABLE users ADD COLUMN IF NOT EXISTS task_change_seq INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE task ADD COLUMN IF NOT EXISTS change_seq INTEGER NOT NULL DEFAULT 0;
+CREATE INDEX IF NOT EXISTS idx_task_user_change_seq ON task(user_id, change_seq);
+CREATE TABLE IF NOT EXISTS task_tombstone (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    task_id INTEGER NOT NULL,
+    change_seq INTEGER NOT NULL,
+    deleted_at TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_task_tombstone_user_change_seq ON task_tombstone(user_id, change_seq);
+
+-- One rollup row per (user, day, category) and (user, period, category); the NULL-category PTO row counts as 0.
+-- Drops duplicates left by overlapping saves of the same day; re-run python backfill_rollups.py afterwards
+DELETE FROM daily_category_rollup a USING daily_category_rollup b
+WHERE a.user_id = b.user_id AND a.date = b.date
+  AND COALESCE(a.category_id, 0) = COALESCE(b.category_id, 0) AND a.id > b.id;
+CREATE UNIQUE INDEX IF NOT EXISTS uq_rollup_user_date_category
+    ON daily_category_rollup(user_id, date, COALESCE(category_id, 0));
+DROP INDEX IF EXISTS idx_rollup_user_date;
+DELETE FROM period_category_rollup a USING period_category_rollup b
+WHERE a.user_id = b.user_id AND a.period = b.period AND a.period_start = b.period_start
+  AND COALESCE(a.category_id, 0) = COALESCE(b.category_id, 0) AND a.id > b.id;
+CREATE UNIQUE INDEX IF NOT EXISTS uq_period_rollup_user_period_category
+    ON period_category_rollup(user_id, period, period_start, COALESCE(category_id, 0));
+DROP INDEX IF EXISTS idx_period_rollup_user_period;
+
+-- Completed blocks of completed tasks per start hour, kept up to date by the task and daily plan writes
+-- (rebuild with: python backfill_rollups.py)
+CREATE TABLE IF NOT EXISTS productive_hour_count (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    hour INTEGER NOT NULL,
+    completed_blocks INTEGER NOT NULL DEFAULT 0,
+    CONSTRAINT uq_productive_hour_user_hour UNIQUE (user_id, hour)
+);
+INSERT INTO productive_hour_count (user_id, hour, completed_blocks)
+SELECT task.user_id, EXTRACT(HOUR FROM time_block.start_time)::INTEGER, COUNT(*)
+FROM time_block JOIN task ON time_block.task_id = task.id
+WHERE task.completed AND time_block.completed
+GROUP BY task.user_id, EXTRACT(HOUR FROM time_block.start_time)
+ON CONFLICT (user_id, hour) DO NOTHING;
@@ -0,0 +1,210 @@
+"""Full-text search over tasks, task comments and daily plans (priorities and brain dump).
+
+Every searchable record is one row of ``search_index``: an FTS5 virtual table on
+SQLite, and on Postgres a table with a stored, weighted tsvector behind a GIN index.
+The row id is derived from the record's type and id, so write paths update or remove
+a document with a single keyed statement. Titles (task titles, a day's priorities)
+rank above bodies (descriptions, notes, comments, brain dumps).
+"""
+import html
+import re
+
+from sqlalchemy import DDL, event, text
+
+from models import db, Task, TaskComment, DailyPlan, Priority
+
+DOC_TYPES = ('task', 'comment', 'daily_plan')
+
+# Highlight sentinels: search engines wrap matches in these, and search_documents turns
+# them into <mark> after HTML-escaping the snippet text
+_MARK_START, _MARK_END = '\x02', '\x03'
+
+SQLITE_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+    "title, body, user_id UNINDEXED, doc_type UNINDEXED, doc_id UNINDEXED, parent_id UNINDEXED, "
+    "doc_date UNINDEXED, tokenize = 'porter unicode61')"
+)
+# Postgres' default text search parser reads "<...>" as markup and drops it, so angle brackets
+# are turned into spaces before indexing and highlighting
+POSTGRES_DDL = (
+    """CREATE TABLE IF NOT EXISTS search_index (
+    id BIGINT PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    doc_type VARCHAR(20) NOT NULL,
+    doc_id INTEGER NOT NULL,
+    parent_id INTEGER,
+    doc_date DATE,
+    title TEXT,
+    body TEXT,
+    search_vector TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', translate(coalesce(title, ''), '<>', '  ')), 'A') ||
+        setweight(to_tsvector('english', translate(coalesce(body, ''), '<>', '  ')), 'B')
+    ) STORED
+)""",
+    "CREATE INDEX IF NOT EXISTS idx_search_index_vector ON search_index USING GIN (search_vector)",
+    "CREATE INDEX IF NOT EXISTS idx_search_index_user ON search_index (user_id)",
+)
+
+# db.create_all() creates the index table for the current dialect; db.drop_all() removes it
+event.listen(db.metadata, 'after_create', DDL(SQLITE_DDL).execute_if(dialect='sqlite'))
+for statement in POSTGRES_DDL:
+    event.listen(db.metadata, 'after_create', DDL(statement).execute_if(dialect='postgresql'))
+event.listen(db.metadata, 'before_drop', DDL("DROP TABLE IF EXISTS search_index"))
+
+def _dialect():
+    return db.session.get_bind().dialect.name
+
+def doc_key(doc_type, doc_id):
+    """Row id of a document: unique per (type, record id)"""
+    return doc_id * 4 + DOC_TYPES.index(doc_type)
+
+def _write_documents(documents):
+    """Insert or replace documents given as dicts of the search_index columns"""
+    if not documents:
+        return
+    rows = [{**document, 'id': doc_key(document['doc_type'], document['doc_id'])} for document in documents]
+    if _dialect() == 'postgresql':
+        db.session.execute(text(
+            "INSERT INTO search_index (id, user_id, doc_type, doc_id, parent_id, doc_date, title, body) "
+            "VALUES (:id, :user_id, :doc_type, :doc_id, :parent_id, :doc_date, :title, :body) "
+            "ON CONFLICT (id) DO UPDATE SET parent_id = EXCLUDED.parent_id, doc_date = EXCLUDED.doc_date, "
+            "title = EXCLUDED.title, body = EXCLUDED.body"
+        ), rows)
+    else:
+        db.session.execute(text("DELETE FROM search_index WHERE rowid = :id"), rows)
+        db.session.execute(text(
+            "INSERT INTO search_index (rowid, user_id, doc_type, doc_id, parent_id, doc_date, title, body) "
+            "VALUES (:id, :user_id, :doc_type, :doc_id, :parent_id, :doc_date, :title, :body)"
+        ), rows)
+
+def _delete_documents(keys):
+    if keys:
+        id_column = 'id' if _dialect() == 'postgresql' else 'rowid'
+        db.session.execute(text(f"DELETE FROM search_index WHERE {id_column} = :id"), [{'id': key} for key in keys])
+
+def _task_document(task):
+    return {
+        'user_id': task.user_id, 'doc_type': 'task', 'doc_id': task.id, 'parent_id': None,
+        'doc_date': task.created_at.date().isoformat() if task.created_at else None,
+        'title': task.title or '',
+        'body': '\n'.join(part for part in (task.description, task.notes) if part)
+    }
+
+def _comment_document(comment):
+    return {
+        'user_id': comment.user_id, 'doc_type': 'comment', 'doc_id': comment.id, 'parent_id': comment.task_id,
+        'doc_date': comment.created_at.date().isoformat() if comment.created_at else None,
+        'title': '', 'body': comment.content or ''
+    }
+
+def _plan_document(plan, priorities):
+    return {
+        'user_id': plan.user_id, 'doc_type': 'daily_plan', 'doc_id': plan.id, 'parent_id': None,
+        'doc_date': plan.date.isoformat(),
+        'title': '\n'.join(priorities), 'body': plan.brain_dump or ''
+    }
+
+def index_task(task):
+    """Add or refresh a task's document (call after the task is flushed)"""
+    _write_documents([_task_document(task)])
+
+def index_comment(comment):
+    """Add a task comment's document (call after the comment is flushed)"""
+    _write_documents([_comment_document(comment)])
+
+def index_daily_plan(plan):
+    """Refresh a day's document from its current priorities and brain dump"""
+    priorities = [content for (content,) in db.session.query(Priority.content).filter(
+        Priority.daily_plan_id == plan.id
+    ).order_by(Priority.order).all()]
+    if not priorities and not (plan.brain_dump or '').strip():
+        _delete_documents([doc_key('daily_plan', plan.id)])
+    else:
+        _write_documents([_plan_document(plan, priorities)])
+
+def remove_task_documents(task_ids):
+    """Drop the documents of tasks being deleted, and of their comments"""
+    if not task_ids:
+        return
+    comment_ids = [comment_id for (comment_id,) in db.session.query(TaskComment.id).filter(
+        TaskComment.task_id.in_(task_ids)
+    ).all()]
+    _delete_documents([doc_key('task', task_id) for task_id in task_ids] +
+                      [doc_key('comment', comment_id) for comment_id in comment_ids])
+
+def rebuild_search_index(user_id):
+    """Re-index every task, comment and daily plan of a user from scratch (caller commits)"""
+    db.session.execute(text("DELETE FROM search_index WHERE user_id = :user_id"), {'user_id': user_id})
+
+    documents = [_task_document(task) for task in Task.query.filter_by(user_id=user_id).all()]
+    documents += [_comment_document(comment) for comment in TaskComment.query.filter_by(user_id=user_id).all()]
+
+    priorities = {}
+    for plan_id, content in db.session.query(Priority.daily_plan_id, Priority.content).join(
+        DailyPlan, Priority.daily_plan_id == DailyPlan.id
+    ).filter(DailyPlan.user_id == user_id).order_by(Priority.daily_plan_id, Priority.order).all():
+        priorities.setdefault(plan_id, []).append(content)
+    for plan in DailyPlan.query.filter_by(user_id=user_id).all():
+        if priorities.get(plan.id) or (plan.brain_dump or '').strip():
+            documents.append(_plan_document(plan, priorities.get(plan.id, [])))
+
+    _write_documents(documents)
+    return len(documents)
+
+def _query_terms(query):
+    """Words of a free-text query, lowercased, with search operators stripped"""
+    return re.findall(r'\w+', query.lower())
+
+def _snippet_html(snippet):
+    escaped = html.escape(snippet or '')
+    return escaped.replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>')
+
+def search_documents(user_id, query, limit=20, offset=0, doc_types=None):
+    """Ranked matches for a free-text query, best first.
+
+    Every word must match, as a prefix, in any indexed text. Returns ``(results,
+    has_more)``; each result has type, id, parent_id, date, rank and snippet_html
+    (escaped text with matches wrapped in <mark>).
+    """
+    terms = _query_terms(query)
+    if not terms:
+        return [], False
+
+    params = {'user_id': user_id, 'limit': limit + 1, 'offset': offset}
+    type_filter = ''
+    if doc_types:
+        type_filter = ' AND doc_type IN (' + ', '.join(f':type_{i}' for i in range(len(doc_types))) + ')'
+        params.update({f'type_{i}': doc_type for i, doc_type in enumerate(doc_types)})
+
+    if _dialect() == 'postgresql':
+        params['query'] = ' & '.join(f'{term}:*' for term in terms)
+        rows = db.session.execute(text(
+            "SELECT doc_type, doc_id, parent_id, doc_date, "
+            "ts_rank_cd(search_vector, query) AS rank, "
+            "ts_headline('english', translate(concat_ws(' ', title, body), '<>', '  '), query, "
+            "'StartSel=\x02, StopSel=\x03, MaxWords=30, MinWords=10, MaxFragments=2') AS snippet "
+            "FROM search_index, to_tsquery('english', :query) AS query "
+            "WHERE user_id = :user_id AND search_vector @@ query" + type_filter + " "
+            "ORDER BY rank DESC, id LIMIT :limit OFFSET :offset"
+        ), params).all()
+    else:
+        params['query'] = ' '.join(f'"{term}"*' for term in terms)
+        rows = db.session.execute(text(
+            "SELECT doc_type, doc_id, parent_id, doc_date, -bm25(search_index, 4.0, 1.0) AS rank, "
+            "snippet(search_index, -1, '\x02', '\x03', '...', 24) AS snippet "
+            "FROM search_index WHERE search_index MATCH :query AND user_id = :user_id" + type_filter + " "
+            "ORDER BY rank DESC, rowid LIMIT :limit OFFSET :offset"
+        ), params).all()
+
+    results = [
+        {
+            'type': doc_type,
+            'id': doc_id,
+            'parent_id': parent_id,
+            'date': str(doc_date) if doc_date else None,
+            'rank': float(rank),
+            'snippet_html': _snippet_html(snippet)
+        }
+        for doc_type, doc_id, parent_id, doc_date, rank, snippet in rows[:limit]
+    ]
+    return results, len(rows) > limit
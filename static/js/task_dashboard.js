@@ -1,5 +1,8 @@
 // Enhanced Task Dashboard JavaScript
 let currentTasks = [];
+let nextTaskCursor = null;
+let taskChangeCursor = null;
+const TASK_PAGE_SIZE = 100;
 let currentRoles = [];
 let currentCategories = [];
 let selectedTaskId = null;
@@ -14,8 +17,8 @@ document.addEventListener('DOMContentLoaded', function() {
     // Set up event listeners
     setupEventListeners();
     
-    // Auto-refresh analytics every 30 seconds
-    setInterval(loadAnalytics, 30000);
+    // Pick up changes made elsewhere every 30 seconds; analytics reload only when tasks changed
+    setInterval(syncTasks, 30000);
 });
 
 function setupEventListeners() {
@@ -24,6 +27,7 @@ function setupEventListeners() {
     document.getElementById('priority-filter').addEventListener('change', filterTasks);
     document.getElementById('role-filter').addEventListener('change', filterTasks);
     document.getElementById('overdue-filter').addEventListener('change', filterTasks);
+    document.getElementById('load-more-tasks').addEventListener('click', () => loadTasks(true));
     
     // Modal form handlers
     document.getElementById('save-task-btn').addEventListener('click', saveTask);
@@ -70,12 +74,54 @@ async function loadRoles() {
     }
 }
 
-async function loadTasks() {
+function taskFilterParams() {
+    const params = new URLSearchParams({ limit: TASK_PAGE_SIZE, format: 'normalized' });
+    const status = document.getElementById('status-filter').value;
+    const priority = document.getElementById('priority-filter').value;
+    const roleId = document.getElementById('role-filter').value;
+    if (status) params.set('status', status);
+    if (priority) params.set('priority', priority);
+    if (roleId) params.set('role_id', roleId);
+    if (document.getElementById('overdue-filter').checked) params.set('overdue', 'true');
+    return params;
+}
+
+// Fill category, role and badge color fields back in from a normalized page's side tables
+function expandTaskPage(page) {
+    const categories = new Map(page.categories.map(category => [category.id, category]));
+    const roles = new Map(page.roles.map(role => [role.id, role]));
+    return page.tasks.map(task => {
+        const category = categories.get(task.category_id) || {};
+        const role = roles.get(task.role_id);
+        return {
+            ...task,
+            category_name: category.name,
+            category_color: category.color,
+            role_name: role ? role.name : null,
+            status_color: page.status_colors[task.status] || 'secondary',
+            priority_color: page.priority_colors[task.priority] || 'warning'
+        };
+    });
+}
+
+async function loadTasks(append = false) {
     try {
-        const response = await fetch('/api/tasks');
+        const params = taskFilterParams();
+        if (append && nextTaskCursor) params.set('after', nextTaskCursor);
+        const response = await fetch(`/api/tasks?${params}`);
         if (response.ok) {
-            currentTasks = await response.json();
-            displayTasks(currentTasks);
+            const page = await response.json();
+            const tasks = expandTaskPage(page);
+            currentTasks = append ? currentTasks.concat(tasks) : tasks;
+            nextTaskCursor = page.next_cursor;
+            if (!append) taskChangeCursor = page.change_cursor;
+            if (append) {
+                const tbody = document.getElementById('tasks-tbody');
+                tasks.forEach(task => tbody.appendChild(createTaskRow(task)));
+            } else {
+                displayTasks(currentTasks);
+            }
+            document.getElementById('load-more-tasks').classList.toggle('d-none', !nextTaskCursor);
         }
     } catch (error) {
         console.error('Error loading tasks:', error);
@@ -83,6 +129,54 @@ async function loadTasks() {
     }
 }
 
+// Client-side mirror of the server filters in taskFilterParams, for tasks arriving from the change feed
+function taskMatchesFilters(task) {
+    const status = document.getElementById('status-filter').value;
+    const priority = document.getElementById('priority-filter').value;
+    const roleId = document.getElementById('role-filter').value;
+    if (status && task.status !== status) return false;
+    if (priority && task.priority !== priority) return false;
+    if (roleId && String(task.role_id) !== roleId) return false;
+    if (document.getElementById('overdue-filter').checked && !task.is_overdue) return false;
+    return true;
+}
+
+// Newest first, matching the server's (created_at, id) order
+function compareTasks(a, b) {
+    if (a.created_at !== b.created_at) return a.created_at < b.created_at ? 1 : -1;
+    return b.id - a.id;
+}
+
+// Apply only what changed since the last load or sync, instead of reloading every task
+async function syncTasks() {
+    if (taskChangeCursor == null) return loadTasks();
+    try {
+        const response = await fetch(`/api/tasks/changes?since=${taskChangeCursor}&format=normalized`);
+        if (!response.ok) return loadTasks();
+        const changes = await response.json();
+        taskChangeCursor = changes.cursor;
+        if (!changes.tasks.length && !changes.deleted.length) return;
+
+        // Tasks past the last loaded row belong to pages not fetched yet
+        const lastLoaded = nextTaskCursor ? currentTasks[currentTasks.length - 1] : null;
+        const removed = new Set(changes.deleted);
+        const byId = new Map(currentTasks.filter(task => !removed.has(task.id)).map(task => [task.id, task]));
+        expandTaskPage(changes).forEach(task => {
+            const inLoadedRange = !lastLoaded || compareTasks(task, lastLoaded) <= 0;
+            if (taskMatchesFilters(task) && (byId.has(task.id) || inLoadedRange)) {
+                byId.set(task.id, task);
+            } else {
+                byId.delete(task.id);
+            }
+        });
+        currentTasks = Array.from(byId.values()).sort(compareTasks);
+        displayTasks(currentTasks);
+        loadAnalytics();
+    } catch (error) {
+        console.error('Error syncing tasks:', error);
+    }
+}
+
 async function loadAnalytics() {
     try {
         const response = await fetch('/api/tasks/analytics');
@@ -230,20 +324,8 @@ function createTaskRow(task) {
 }
 
 function filterTasks() {
-    const statusFilter = document.getElementById('status-filter').value;
-    const priorityFilter = document.getElementById('priority-filter').value;
-    const roleFilter = document.getElementById('role-filter').value;
-    const overdueFilter = document.getElementById('overdue-filter').checked;
-    
-    let filteredTasks = currentTasks.filter(task => {
-        if (statusFilter && task.status !== statusFilter) return false;
-        if (priorityFilter && task.priority !== priorityFilter) return false;
-        if (roleFilter && task.role_id != roleFilter) return false;
-        if (overdueFilter && !task.is_overdue) return false;
-        return true;
-    });
-    
-    displayTasks(filteredTasks);
+    // Filters run on the server so paging only ever walks matching tasks
+    loadTasks();
 }
 
 async function saveTask() {
@@ -286,9 +368,8 @@ async function saveTask() {
             modal.hide();
             document.getElementById('task-form').reset();
             
-            // Reload tasks and analytics
-            loadTasks();
-            loadAnalytics();
+            // Pull in the new task and refresh analytics
+            syncTasks();
         } else {
             const error = await response.json();
             showAlert(error.error || 'Failed to create task', 'danger');
@@ -523,8 +604,7 @@ async function updateTaskProgress() {
         
         if (response.ok) {
             showAlert('Progress updated successfully', 'success');
-            loadTasks();
-            loadAnalytics();
+            syncTasks();
         } else {
             const error = await response.json();
             showAlert(error.error || 'Failed to update progress', 'danger');
@@ -547,8 +627,7 @@ async function toggleTaskComplete(taskId, completed) {
         
         if (response.ok) {
             showAlert(`Task marked as ${completed ? 'completed' : 'incomplete'}`, 'success');
-            loadTasks();
-            loadAnalytics();
+            syncTasks();
         } else {
             const error = await response.json();
             showAlert(error.error || 'Failed to update task', 'danger');
@@ -581,8 +660,7 @@ async function deleteTask() {
             showAlert('Task deleted successfully', 'success');
             const modal = bootstrap.Modal.getInstance(document.getElementById('taskDetailModal'));
             modal.hide();
-            loadTasks();
-            loadAnalytics();
+            syncTasks();
         } else {
             showAlert('Failed to delete task', 'danger');
         }
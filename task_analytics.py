@@ -1,6 +1,8 @@
 from datetime import datetime, timedelta
-from models import Task, TimeBlock, Category
-from sqlalchemy import func
+from models import db, Task, TimeBlock, Category, DailyPlan, Role, ProductiveHourCount
+from sqlalchemy import func, case, or_, and_, extract, text
+from time_stats import BLOCK_MINUTES
+from estimation_stats import get_expected_actual_minutes, get_estimation_accuracy_from_stats
 import json
 
 def create_task_template(title, description, category_id, estimated_minutes, buffer_minutes=0, priority='medium'):
@@ -24,8 +26,9 @@ def suggest_time_blocks(task, day_start, day_end, existing_blocks):
     # Get user's most productive hours from analytics
     productive_hours = get_productive_hours(task.user_id)
     
-    # Calculate total blocks needed
-    total_minutes = task.estimated_minutes + task.buffer_minutes
+    # Calculate total blocks needed, sized by how long this kind of task really takes
+    expected_minutes = get_expected_actual_minutes(task.user_id, task.category_id, task.estimated_minutes or 0)['expected_minutes']
+    total_minutes = expected_minutes + (task.buffer_minutes or 0)
     blocks_needed = (total_minutes + 14) // 15  # Round up to nearest 15 minutes
     
     # Find available time slots
@@ -56,23 +59,80 @@ def suggest_time_blocks(task, day_start, day_end, existing_blocks):
     # Return top N slots where N is the number of blocks needed
     return available_slots[:blocks_needed]
 
+def count_completed_blocks_by_hour(user_id, task_ids=None, daily_plan_id=None, completed_tasks_only=True):
+    """Count a user's completed blocks per start hour with one aggregate query, as {hour: count}.
+
+    Only blocks of completed tasks count unless ``completed_tasks_only`` is off; ``task_ids``
+    and ``daily_plan_id`` narrow the count to some tasks or to one day's plan.
+    """
+    query = db.session.query(
+        extract('hour', TimeBlock.start_time),
+        func.count(TimeBlock.id)
+    ).join(Task, TimeBlock.task_id == Task.id).filter(
+        Task.user_id == user_id,
+        TimeBlock.completed == True
+    )
+    if completed_tasks_only:
+        query = query.filter(Task.completed == True)
+    if task_ids is not None:
+        query = query.filter(Task.id.in_(task_ids))
+    if daily_plan_id is not None:
+        query = query.filter(TimeBlock.daily_plan_id == daily_plan_id)
+    rows = query.group_by(extract('hour', TimeBlock.start_time)).all()
+    return {int(hour): count for hour, count in rows}
+
+def get_plan_hour_counts(user_id, daily_plan_id):
+    """Completed blocks of completed tasks per start hour in one daily plan (empty for an unsaved plan)"""
+    if daily_plan_id is None:
+        return {}
+    return count_completed_blocks_by_hour(user_id, daily_plan_id=daily_plan_id)
+
+def apply_productive_hour_changes(user_id, before, after):
+    """Shift the stored hour histogram by the difference between two hour counts.
+
+    Both arguments come from ``count_completed_blocks_by_hour`` over the same tasks or
+    plan, taken before and after a write. Increments run in SQL inside the caller's
+    transaction, like the task time counters.
+    """
+    for hour in set(before) | set(after):
+        delta = after.get(hour, 0) - before.get(hour, 0)
+        if delta:
+            db.session.execute(text(
+                "INSERT INTO productive_hour_count (user_id, hour, completed_blocks) "
+                "VALUES (:user_id, :hour, :delta) "
+                "ON CONFLICT (user_id, hour) DO UPDATE "
+                "SET completed_blocks = productive_hour_count.completed_blocks + :delta"
+            ), {'user_id': user_id, 'hour': hour, 'delta': delta})
+
+def apply_task_completion_hours(user_id, task_id, was_completed, completed):
+    """Add or remove a task's completed blocks when the task itself is completed or reopened"""
+    if bool(was_completed) == bool(completed):
+        return
+    task_hours = count_completed_blocks_by_hour(user_id, task_ids=[task_id], completed_tasks_only=False)
+    if completed:
+        apply_productive_hour_changes(user_id, {}, task_hours)
+    else:
+        apply_productive_hour_changes(user_id, task_hours, {})
+
+def rebuild_productive_hour_counts(user_id):
+    """Recount a user's hour histogram from their time blocks (caller commits)"""
+    ProductiveHourCount.query.filter_by(user_id=user_id).delete()
+    db.session.add_all([
+        ProductiveHourCount(user_id=user_id, hour=hour, completed_blocks=count)
+        for hour, count in count_completed_blocks_by_hour(user_id).items()
+    ])
+
+def get_productive_hour_counts(user_id):
+    """Completed-block histogram by hour for a user, read from the maintained counts"""
+    rows = db.session.query(ProductiveHourCount.hour, ProductiveHourCount.completed_blocks).filter(
+        ProductiveHourCount.user_id == user_id,
+        ProductiveHourCount.completed_blocks > 0
+    ).all()
+    return {hour: count for hour, count in rows}
+
 def get_productive_hours(user_id):
     """Get user's most productive hours based on task completion data"""
-    from app import db
-    
-    # Query completed tasks and their time blocks
-    completed_tasks = Task.query.filter(
-        Task.user_id == user_id,
-        Task.completed == True
-    ).join(TimeBlock).all()
-    
-    # Count completions by hour
-    hour_counts = {}
-    for task in completed_tasks:
-        for block in task.time_blocks:
-            if block.completed:
-                hour = block.start_time.hour
-                hour_counts[hour] = hour_counts.get(hour, 0) + 1
+    hour_counts = get_productive_hour_counts(user_id)
     
     # Normalize scores
     max_count = max(hour_counts.values()) if hour_counts else 1
@@ -132,19 +192,8 @@ def get_task_analytics(user_id):
         Task.user_id == user_id
     ).group_by(Category.name).all()
     
-    # Get time estimation accuracy
-    estimation_stats = db.session.query(
-        func.avg(
-            case(
-                (Task.actual_minutes.isnot(None) & Task.estimated_minutes.isnot(None),
-                 func.abs(Task.actual_minutes - Task.estimated_minutes) / Task.estimated_minutes),
-                else_=None
-            )
-        ).label('avg_error')
-    ).filter(
-        Task.user_id == user_id,
-        Task.completed == True
-    ).scalar()
+    # Get time estimation accuracy from the running per-category statistics
+    estimation_accuracy = get_estimation_accuracy_from_stats(user_id)
     
     # Get productivity by time of day
     time_stats = db.session.query(
@@ -163,7 +212,7 @@ def get_task_analytics(user_id):
             }
             for name, total, completed in category_stats
         ],
-        'estimation_accuracy': (1 - estimation_stats) * 100 if estimation_stats else None,
+        'estimation_accuracy': estimation_accuracy or None,
         'time_stats': [
             {
                 'hour': hour,
@@ -171,4 +220,210 @@ def get_task_analytics(user_id):
             }
             for hour, total, completed in time_stats
         ]
-    }
\ No newline at end of file
+    }
+
+def get_task_summary(user_id, now=None):
+    """Task counters for the dashboard cards, computed by one conditional-aggregate query"""
+    now = now or datetime.utcnow()
+
+    def count_where(condition):
+        return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+    not_completed = or_(Task.completed == False, Task.completed.is_(None))
+    row = db.session.query(
+        func.count(Task.id),
+        count_where(Task.completed == True),
+        count_where(Task.status == 'pending'),
+        count_where(Task.status == 'in_progress'),
+        count_where(Task.status == 'blocked'),
+        count_where((Task.due_date < now) & not_completed),
+        count_where(Task.priority == 'urgent'),
+        count_where(Task.priority == 'high'),
+        count_where(Task.priority == 'medium'),
+        count_where(Task.priority == 'low'),
+        func.coalesce(func.sum(Task.estimated_minutes), 0),
+        func.coalesce(func.sum(Task.actual_minutes), 0),
+        func.coalesce(func.sum(Task.completed_minutes), 0)
+    ).filter(Task.user_id == user_id).one()
+
+    (total, completed, pending, in_progress, blocked, overdue,
+     urgent, high, medium, low, estimated, actual, tracked) = [int(value or 0) for value in row]
+
+    return {
+        'total_tasks': total,
+        'completed_tasks': completed,
+        'pending_tasks': pending,
+        'in_progress_tasks': in_progress,
+        'blocked_tasks': blocked,
+        'overdue_tasks': overdue,
+        'priority_breakdown': {
+            'urgent': urgent,
+            'high': high,
+            'medium': medium,
+            'low': low
+        },
+        'total_estimated_hours': estimated / 60,
+        'total_actual_hours': actual / 60,
+        'total_tracked_hours': tracked / 60,
+        'completion_rate': (completed / total * 100) if total else 0
+    }
+
+def get_category_performance(user_id):
+    """Task counts, completion rate and average tracked time per category in one grouped query"""
+    rows = db.session.query(
+        Category.name,
+        Category.color,
+        func.count(Task.id),
+        func.coalesce(func.sum(case((Task.completed == True, 1), else_=0)), 0),
+        func.coalesce(func.sum(Task.completed_minutes), 0)
+    ).outerjoin(
+        Task, (Task.category_id == Category.id) & (Task.user_id == user_id)
+    ).filter(
+        Category.user_id == user_id
+    ).group_by(Category.id, Category.name, Category.color).order_by(Category.id).all()
+
+    return [
+        {
+            'name': name,
+            'color': color,
+            'total_tasks': total,
+            'completed_tasks': int(completed),
+            'completion_rate': (int(completed) / total * 100) if total else 0,
+            'avg_time_spent': int(minutes) / total if total else 0
+        }
+        for name, color, total, completed, minutes in rows
+    ]
+
+def get_estimation_accuracy(user_id):
+    """100 minus the mean relative estimation error (in percent) over completed, estimated tasks"""
+    return get_estimation_accuracy_from_stats(user_id)
+
+def get_role_task_counts(user_id):
+    """Task counts and maintained time counters per role id (None = unassigned) in one grouped query"""
+    rows = db.session.query(
+        Task.role_id,
+        func.count(Task.id),
+        func.coalesce(func.sum(case((Task.completed == True, 1), else_=0)), 0),
+        func.coalesce(func.sum(Task.tracked_minutes), 0),
+        func.coalesce(func.sum(Task.completed_minutes), 0)
+    ).filter(Task.user_id == user_id).group_by(Task.role_id).all()
+    return {
+        role_id: {
+            'task_count': total,
+            'completed_tasks': int(completed),
+            'total_tracked_minutes': int(tracked),
+            'total_completed_minutes': int(completed_minutes)
+        }
+        for role_id, total, completed, tracked, completed_minutes in rows
+    }
+
+def get_role_time(user_id, start_date, end_date):
+    """Planned and completed block minutes per role id between two dates, in one grouped query"""
+    rows = db.session.query(
+        Task.role_id,
+        func.count(TimeBlock.id) * BLOCK_MINUTES,
+        func.coalesce(func.sum(case((TimeBlock.completed == True, BLOCK_MINUTES), else_=0)), 0)
+    ).select_from(TimeBlock).join(
+        DailyPlan, TimeBlock.daily_plan_id == DailyPlan.id
+    ).join(
+        Task, TimeBlock.task_id == Task.id
+    ).filter(
+        DailyPlan.user_id == user_id,
+        DailyPlan.date.between(start_date, end_date)
+    ).group_by(Task.role_id).all()
+    return {role_id: (int(planned or 0), int(completed or 0)) for role_id, planned, completed in rows}
+
+def get_role_analytics(user_id, start_date, end_date):
+    """Per-role task counts plus time in range, including an unassigned bucket, in three queries"""
+    roles = Role.query.filter_by(user_id=user_id).order_by(Role.created_at.desc()).all()
+    counts = get_role_task_counts(user_id)
+    time_in_range = get_role_time(user_id, start_date, end_date)
+
+    def entry(role_id, name, color):
+        role_counts = counts.get(role_id, {})
+        planned, completed = time_in_range.get(role_id, (0, 0))
+        task_count = role_counts.get('task_count', 0)
+        return {
+            'id': role_id,
+            'name': name,
+            'color': color,
+            'task_count': task_count,
+            'completed_tasks': role_counts.get('completed_tasks', 0),
+            'completion_rate': (role_counts.get('completed_tasks', 0) / task_count * 100) if task_count else 0,
+            'planned_hours': round(planned / 60, 2),
+            'completed_hours': round(completed / 60, 2),
+            'total_tracked_hours': round(role_counts.get('total_tracked_minutes', 0) / 60, 2),
+            'total_completed_hours': round(role_counts.get('total_completed_minutes', 0) / 60, 2)
+        }
+
+    results = [entry(role.id, role.name, role.color) for role in roles]
+    if None in counts or None in time_in_range:
+        results.append(entry(None, 'No role', '#adb5bd'))
+    return {
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'roles': results
+    }
+
+def parse_leaderboard_cursor(cursor):
+    """Split a "minutes-task_id" leaderboard cursor; raises ValueError when malformed"""
+    minutes, task_id = cursor.split('-', 1)
+    return int(minutes), int(task_id)
+
+def get_task_leaderboard(user_id, start_date, end_date, limit, after=None, task_minutes=None):
+    """One page of tasks ranked by scheduled minutes in a date range, largest first.
+
+    Pages are keyset-paginated on (minutes desc, task id): ``after`` is the cursor
+    returned with the previous page. ``task_minutes`` may supply precomputed
+    {task_id: minutes} totals; otherwise the ranking is a grouped query with LIMIT.
+    Returns ``(rows, next_cursor)``; ``next_cursor`` is None on the last page.
+    """
+    after_key = parse_leaderboard_cursor(after) if after else None
+
+    if task_minutes is not None:
+        ranked = sorted(((minutes, task_id) for task_id, minutes in task_minutes.items() if minutes),
+                        key=lambda item: (-item[0], item[1]))
+        if after_key:
+            ranked = [(m, t) for m, t in ranked if m < after_key[0] or (m == after_key[0] and t > after_key[1])]
+        page = [(task_id, minutes) for minutes, task_id in ranked[:limit + 1]]
+    else:
+        minutes_expr = func.count(TimeBlock.id) * BLOCK_MINUTES
+        query = db.session.query(Task.id, minutes_expr).select_from(TimeBlock).join(
+            DailyPlan, TimeBlock.daily_plan_id == DailyPlan.id
+        ).join(
+            Task, TimeBlock.task_id == Task.id
+        ).filter(
+            DailyPlan.user_id == user_id,
+            DailyPlan.date.between(start_date, end_date)
+        ).group_by(Task.id)
+        if after_key:
+            query = query.having(or_(
+                minutes_expr < after_key[0],
+                and_(minutes_expr == after_key[0], Task.id > after_key[1])
+            ))
+        page = [(task_id, int(minutes)) for task_id, minutes in
+                query.order_by(minutes_expr.desc(), Task.id).limit(limit + 1).all()]
+
+    has_more = len(page) > limit
+    page = page[:limit]
+    info = {}
+    if page:
+        info = {row[0]: row for row in db.session.query(
+            Task.id, Task.title, Task.category_id, Category.name, Category.color
+        ).join(Category, Task.category_id == Category.id).filter(
+            Task.id.in_([task_id for task_id, _ in page])
+        ).all()}
+
+    rows = [
+        {
+            'id': task_id,
+            'title': info[task_id][1],
+            'minutes': minutes,
+            'category_id': info[task_id][2],
+            'category_name': info[task_id][3],
+            'category_color': info[task_id][4]
+        }
+        for task_id, minutes in page if task_id in info
+    ]
+    next_cursor = f"{page[-1][1]}-{page[-1][0]}" if has_more else None
+    return rows, next_cursor
@@ -0,0 +1,90 @@
+"""Change feed for a user's tasks (GET /api/tasks/changes).
+
+Every write that changes a task's JSON stamps the task with the next value of the
+user's task_change_seq, and deleting a task leaves a TaskTombstone with one. The
+counter lives on the user row, which stays locked until the write commits, so a
+user's changes always commit in sequence order and a client that has applied
+everything up to a cursor can fetch just what came after it with an index range
+scan, however many tasks the user has.
+
+Task writes run under invalidates_user_data, which updates that same user row
+before the view touches anything else. Bumping the sequence here therefore never
+takes a new lock partway through a transaction, and a user's concurrent writes
+queue on the user row instead of deadlocking on each other's task rows.
+"""
+from sqlalchemy import func, update
+
+from models import db, User, Task, TaskTombstone
+from task_serializer import load_task_rows
+
+def parse_change_cursor(cursor):
+    """Sequence number from a change feed cursor; raises ValueError when malformed"""
+    seq = int(cursor)
+    if seq < 0:
+        raise ValueError(f"Invalid change cursor: {cursor}")
+    return seq
+
+def get_task_change_cursor(user_id):
+    """Cursor for the current state of a user's tasks (read it before reading the tasks)"""
+    seq = db.session.query(User.task_change_seq).filter(User.id == user_id).scalar()
+    return str(seq or 0)
+
+def next_task_change_seq(user_id):
+    """Advance the user's change sequence inside the caller's transaction and return it.
+
+    The caller must already hold the user row (see invalidates_user_data); otherwise
+    this lock would be taken after task rows and could deadlock against another write.
+    """
+    return db.session.execute(
+        update(User).where(User.id == user_id).values(
+            task_change_seq=func.coalesce(User.task_change_seq, 0) + 1
+        ).returning(User.task_change_seq),
+        execution_options={'synchronize_session': False}
+    ).scalar()
+
+def mark_tasks_changed(user_id, task_ids=(), deleted_task_ids=()):
+    """Stamp changed tasks with a new change sequence and tombstone deleted ones.
+
+    Parents of the given tasks (whose subtask_count may move) and subtasks of deleted
+    tasks (which lose their parent) are stamped too. Call after new tasks are flushed
+    and before deleted ones are removed.
+    """
+    task_ids = {task_id for task_id in task_ids if task_id}
+    deleted_task_ids = set(deleted_task_ids)
+    if not task_ids and not deleted_task_ids:
+        return
+    related_ids = task_ids | deleted_task_ids
+    task_ids.update(parent_id for (parent_id,) in db.session.query(Task.parent_task_id).filter(
+        Task.id.in_(related_ids), Task.parent_task_id.isnot(None)
+    ).all())
+    if deleted_task_ids:
+        task_ids.update(child_id for (child_id,) in db.session.query(Task.id).filter(
+            Task.parent_task_id.in_(deleted_task_ids)
+        ).all())
+    task_ids -= deleted_task_ids
+
+    seq = next_task_change_seq(user_id)
+    if task_ids:
+        Task.query.filter(Task.user_id == user_id, Task.id.in_(task_ids)).update(
+            {Task.change_seq: seq}, synchronize_session=False
+        )
+    if deleted_task_ids:
+        db.session.add_all([TaskTombstone(user_id=user_id, task_id=task_id, change_seq=seq)
+                            for task_id in sorted(deleted_task_ids)])
+
+def get_task_changes(user_id, since):
+    """Tasks changed and task ids deleted after sequence ``since``.
+
+    Returns ``(cursor, tasks, deleted_ids)`` with tasks as load_task_rows tuples. The
+    cursor is read first, so a change committed meanwhile is sent again next time
+    rather than missed; applying the feed is idempotent.
+    """
+    cursor = get_task_change_cursor(user_id)
+    tasks = load_task_rows(Task.query.filter(
+        Task.user_id == user_id, Task.change_seq > since
+    ).order_by(Task.change_seq, Task.id))
+    live_ids = {task[0] for task in tasks}
+    deleted_ids = [task_id for (task_id,) in db.session.query(TaskTombstone.task_id).filter(
+        TaskTombstone.user_id == user_id, TaskTombstone.change_seq > since
+    ).order_by(TaskTombstone.change_seq, TaskTombstone.task_id).all() if task_id not in live_ids]
+    return cursor, tasks, list(dict.fromkeys(deleted_ids))
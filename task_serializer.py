@@ -0,0 +1,122 @@
+"""The task JSON returned by GET, POST and PUT /api/tasks.
+
+Tasks are serialized from plain column values (a Task or a tuple of task columns)
+plus lookup maps of categories, roles and subtask counts fetched once for the whole
+batch, so serializing never lazy-loads a relationship and a page of tasks costs the
+same few queries however many tasks it holds.
+"""
+from datetime import datetime
+from operator import attrgetter
+
+from sqlalchemy import func
+
+from models import db, Task, Category, Role, TASK_STATUS_COLORS, TASK_PRIORITY_COLORS
+
+# Keys of each serialized task, selectable on GET /api/tasks with ?fields=
+TASK_FIELDS = ('id', 'title', 'description', 'category_id', 'category_name', 'category_color', 'due_date',
+               'status', 'status_color', 'role_id', 'role_name', 'is_recurring', 'recurrence_rule',
+               'priority', 'priority_color', 'completed', 'completed_at', 'estimated_minutes',
+               'actual_minutes', 'total_time_spent', 'notes', 'tags', 'dependencies',
+               'progress_percentage', 'last_worked_on', 'parent_task_id', 'subtask_count',
+               'is_overdue', 'created_at')
+
+# Keys repeated from the category, role and color tables; the normalized format leaves them out
+DENORMALIZED_FIELDS = ('category_name', 'category_color', 'role_name', 'status_color', 'priority_color')
+
+# Task columns the serializer reads, in the order serialize_task unpacks them
+TASK_COLUMNS = ('id', 'title', 'description', 'category_id', 'due_date', 'status', 'role_id', 'is_recurring',
+                'recurrence_rule', 'priority', 'completed', 'completed_at', 'estimated_minutes',
+                'actual_minutes', 'completed_minutes', 'notes', 'tags', 'dependencies',
+                'progress_percentage', 'last_worked_on', 'parent_task_id', 'created_at')
+_task_values = attrgetter(*TASK_COLUMNS)
+
+def load_task_rows(query):
+    """Run a Task query for plain tuples of TASK_COLUMNS instead of ORM objects"""
+    statement = query.with_entities(*[getattr(Task, column) for column in TASK_COLUMNS]).statement
+    return [tuple(row) for row in db.session.execute(statement)]
+
+def load_task_lookups(user_id, tasks):
+    """Categories, roles and subtask counts referenced by a batch of tasks (Task objects or
+    load_task_rows tuples), one query each"""
+    tasks = [task if isinstance(task, tuple) else _task_values(task) for task in tasks]
+    category_ids = {task[3] for task in tasks}
+    role_ids = {task[6] for task in tasks if task[6]}
+    task_ids = [task[0] for task in tasks]
+
+    categories = {}
+    if category_ids:
+        categories = {category_id: (name, color) for category_id, name, color in db.session.query(
+            Category.id, Category.name, Category.color
+        ).filter(Category.user_id == user_id, Category.id.in_(category_ids)).all()}
+    roles = {}
+    if role_ids:
+        roles = dict(db.session.query(Role.id, Role.name).filter(
+            Role.user_id == user_id, Role.id.in_(role_ids)
+        ).all())
+    subtask_counts = {}
+    if task_ids:
+        subtask_counts = dict(db.session.query(Task.parent_task_id, func.count(Task.id)).filter(
+            Task.parent_task_id.in_(task_ids)
+        ).group_by(Task.parent_task_id).all())
+    return {'categories': categories, 'roles': roles, 'subtask_counts': subtask_counts}
+
+def serialize_task(task, lookups, now=None, normalized=False):
+    """Task dict from a Task or load_task_rows tuple and the batch lookups from load_task_lookups.
+
+    With ``normalized`` the DENORMALIZED_FIELDS are left out; see normalize_task_lookups.
+    """
+    (task_id, title, description, category_id, due_date, status, role_id, is_recurring, recurrence_rule,
+     priority, completed, completed_at, estimated_minutes, actual_minutes, completed_minutes, notes, tags,
+     dependencies, progress_percentage, last_worked_on, parent_task_id,
+     created_at) = task if isinstance(task, tuple) else _task_values(task)
+    item = {
+        'id': task_id,
+        'title': title,
+        'description': description,
+        'category_id': category_id,
+        'due_date': due_date.isoformat() if due_date else None,
+        'status': status,
+        'role_id': role_id,
+        'is_recurring': is_recurring,
+        'recurrence_rule': recurrence_rule,
+        'priority': priority,
+        'completed': completed,
+        'completed_at': completed_at.isoformat() if completed_at else None,
+        'estimated_minutes': estimated_minutes,
+        'actual_minutes': actual_minutes,
+        'total_time_spent': completed_minutes or 0,
+        'notes': notes,
+        'tags': tags or [],
+        'dependencies': dependencies or [],
+        'progress_percentage': progress_percentage,
+        'last_worked_on': last_worked_on.isoformat() if last_worked_on else None,
+        'parent_task_id': parent_task_id,
+        'subtask_count': lookups['subtask_counts'].get(task_id, 0),
+        'is_overdue': due_date and due_date < (now or datetime.utcnow()) and not completed,
+        'created_at': created_at.isoformat()
+    }
+    if not normalized:
+        item['category_name'], item['category_color'] = lookups['categories'].get(category_id, (None, None))
+        item['role_name'] = lookups['roles'].get(role_id)
+        item['status_color'] = TASK_STATUS_COLORS.get(status, 'secondary')
+        item['priority_color'] = TASK_PRIORITY_COLORS.get(priority, 'warning')
+    return item
+
+def serialize_tasks(tasks, lookups, fields=None, normalized=False):
+    """Serialize a batch of tasks, trimmed to ``fields`` (plus id) when given"""
+    now = datetime.utcnow()
+    items = [serialize_task(task, lookups, now, normalized) for task in tasks]
+    if fields:
+        keys = ['id', *[field for field in fields if field != 'id']]
+        items = [{key: item[key] for key in keys} for item in items]
+    return items
+
+def normalize_task_lookups(lookups):
+    """Side tables for normalized task lists: each referenced category and role once, plus the badge colors"""
+    return {
+        'categories': [{'id': category_id, 'name': name, 'color': color}
+                       for category_id, (name, color) in lookups['categories'].items()],
+        'roles': [{'id': role_id, 'name': name} for role_id, name in lookups['roles'].items()],
+        'status_colors': TASK_STATUS_COLORS,
+        'priority_colors': TASK_PRIORITY_COLORS
+    }
@@ -0,0 +1,152 @@
+from datetime import timedelta
+from sqlalchemy import case, func, and_, or_, null
+from models import db, Category, DailyCategoryRollup
+
+# Each time block represents 15 minutes
+BLOCK_MINUTES = 15
+
+def get_category_window_minutes(user_id, category_names, windows, end_date):
+    """Sum scheduled minutes per category and PTO minutes over several date windows in one rollup query.
+
+    ``windows`` maps a window name to its first date; every window ends on ``end_date``.
+    Returns ``(category_rows, pto_minutes)`` where ``category_rows`` is a list of dicts
+    with ``id``, ``name``, ``color`` and one minutes total per window, and
+    ``pto_minutes`` maps each window name to its PTO minutes.
+    """
+    earliest = min(windows.values())
+    in_range = and_(
+        DailyCategoryRollup.user_id == user_id,
+        DailyCategoryRollup.date.between(earliest, end_date)
+    )
+
+    block_sums = [
+        func.coalesce(func.sum(case((DailyCategoryRollup.date >= start, DailyCategoryRollup.planned_minutes), else_=0)), 0).label(name)
+        for name, start in windows.items()
+    ]
+    pto_sums = [
+        func.coalesce(func.sum(case((DailyCategoryRollup.date >= start, DailyCategoryRollup.pto_minutes), else_=0)), 0).label(name)
+        for name, start in windows.items()
+    ]
+
+    # Outer join keeps tracked categories with no blocks in range so their colors still render
+    category_query = db.session.query(
+        Category.id.label('category_id'),
+        Category.name.label('name'),
+        Category.color.label('color'),
+        *block_sums
+    ).outerjoin(
+        DailyCategoryRollup, and_(DailyCategoryRollup.category_id == Category.id, in_range)
+    ).filter(
+        Category.user_id == user_id,
+        Category.name.in_(category_names)
+    ).group_by(Category.id, Category.name, Category.color)
+
+    pto_query = db.session.query(
+        null().label('category_id'),
+        null().label('name'),
+        null().label('color'),
+        *pto_sums
+    ).filter(in_range, DailyCategoryRollup.category_id.is_(None))
+
+    category_rows = []
+    pto_minutes = {name: 0 for name in windows}
+    for row in category_query.union_all(pto_query).all():
+        values = row._asdict()
+        totals = {name: values.get(name) or 0 for name in windows}
+        if values['category_id'] is None:
+            pto_minutes = totals
+        else:
+            category_rows.append({
+                'id': values['category_id'],
+                'name': values['name'],
+                'color': values['color'],
+                **totals
+            })
+
+    return category_rows, pto_minutes
+
+# Trailing window used for the historical completion rate in forecasts
+FORECAST_HISTORY_DAYS = 56
+
+def _goal_projection(goal, start, end, planned_to_date, pto_to_date, planned_future, pto_future, completion_rate):
+    to_date = planned_to_date + pto_to_date
+    expected_future = planned_future * completion_rate + pto_future
+    projected = to_date + expected_future
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'goal_hours': goal,
+        'to_date_hours': round(to_date / 60, 1),
+        'planned_remaining_hours': round((planned_future + pto_future) / 60, 1),
+        'expected_remaining_hours': round(expected_future / 60, 1),
+        'projected_hours': round(projected / 60, 1),
+        'projected_percent': round(projected / 60 / goal * 100, 1) if goal else 0,
+        'shortfall_hours': round(max(goal - projected / 60, 0), 1),
+        'on_track': projected / 60 >= goal
+    }
+
+def get_goal_forecast(user_id, category_name, today, weekly_goal, monthly_goal, include_pto=True):
+    """Project end-of-week and end-of-month hours for one category from the daily rollups.
+
+    Hours already scheduled up to ``today`` count in full (the same rule as the
+    work hour progress bars); blocks planned for later days are discounted by the
+    category's completion rate over the previous ``FORECAST_HISTORY_DAYS`` days.
+    Everything comes from one conditional-aggregate rollup query.
+    """
+    week_start = today - timedelta(days=today.weekday())
+    week_end = week_start + timedelta(days=6)
+    month_start = today.replace(day=1)
+    month_end = (month_start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    history_start = today - timedelta(days=FORECAST_HISTORY_DAYS)
+    tomorrow = today + timedelta(days=1)
+
+    ranges = {
+        'week_to_date': (week_start, today),
+        'week_future': (tomorrow, week_end),
+        'month_to_date': (month_start, today),
+        'month_future': (tomorrow, month_end),
+        'history': (history_start, today - timedelta(days=1))
+    }
+
+    is_category = DailyCategoryRollup.category_id.isnot(None)
+    columns = []
+    for name, (start, end) in ranges.items():
+        in_range = DailyCategoryRollup.date.between(start, end)
+        columns += [
+            func.coalesce(func.sum(case((in_range & is_category, DailyCategoryRollup.planned_minutes), else_=0)), 0),
+            func.coalesce(func.sum(case((in_range & is_category, DailyCategoryRollup.completed_minutes), else_=0)), 0),
+            func.coalesce(func.sum(case((in_range, DailyCategoryRollup.pto_minutes), else_=0)), 0)
+        ]
+
+    category_match = func.lower(Category.name) == category_name.lower()
+    row_filter = or_(category_match, DailyCategoryRollup.category_id.is_(None)) if include_pto else category_match
+    row = db.session.query(*columns).select_from(DailyCategoryRollup).outerjoin(
+        Category, DailyCategoryRollup.category_id == Category.id
+    ).filter(
+        DailyCategoryRollup.user_id == user_id,
+        DailyCategoryRollup.date.between(min(history_start, month_start), max(week_end, month_end)),
+        row_filter
+    ).one()
+
+    totals = {}
+    for index, name in enumerate(ranges):
+        planned, completed, pto = row[index * 3:index * 3 + 3]
+        totals[name] = (float(planned or 0), float(completed or 0), float(pto or 0))
+
+    history_planned, history_completed, _ = totals['history']
+    completion_rate = history_completed / history_planned if history_planned else 1.0
+
+    def projection(prefix, goal, start, end):
+        planned_to_date, _, pto_to_date = totals[f'{prefix}_to_date']
+        planned_future, _, pto_future = totals[f'{prefix}_future']
+        return _goal_projection(goal, start, end, planned_to_date, pto_to_date,
+                                planned_future, pto_future, completion_rate)
+
+    return {
+        'date': today.isoformat(),
+        'category': category_name,
+        'completion_rate': round(completion_rate * 100, 1),
+        'history_days': FORECAST_HISTORY_DAYS,
+        'week': projection('week', weekly_goal, week_start, week_end),
+        'month': projection('month', monthly_goal, month_start, month_end)
+    }
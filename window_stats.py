@@ -0,0 +1,144 @@
+"""Trailing-window totals served as "precomputed through yesterday + today's live delta".
+
+A snapshot holds category and task totals for the ``window_days`` days ending on
+``through_date``. The window ending today is the snapshot ending yesterday, minus
+the day that slid out of the window, plus today; both of those are single-day
+lookups, so requests never aggregate the whole window.
+"""
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import db, User, DailyPlan, TimeBlock, WindowStatsSnapshot
+from rollups import get_category_rollup_totals
+from time_stats import BLOCK_MINUTES
+
+logger = logging.getLogger(__name__)
+
+PRECOMPUTED_WINDOWS = (30, 180, 365)
+
+def get_task_window_totals(user_id, start_date, end_date):
+    """Planned and completed minutes per task between two dates, as {task_id: (planned, completed)}"""
+    rows = db.session.query(
+        TimeBlock.task_id,
+        func.count(TimeBlock.id) * BLOCK_MINUTES,
+        func.sum(case((TimeBlock.completed == True, BLOCK_MINUTES), else_=0))
+    ).join(
+        DailyPlan, TimeBlock.daily_plan_id == DailyPlan.id
+    ).filter(
+        DailyPlan.user_id == user_id,
+        DailyPlan.date.between(start_date, end_date),
+        TimeBlock.task_id.isnot(None)
+    ).group_by(TimeBlock.task_id).all()
+    return {task_id: (int(planned or 0), int(completed or 0)) for task_id, planned, completed in rows}
+
+def compute_window_totals(user_id, start_date, end_date):
+    """Category totals (from the daily rollups) and task totals for an inclusive date range"""
+    return {
+        'categories': get_category_rollup_totals(user_id, start_date, end_date),
+        'tasks': get_task_window_totals(user_id, start_date, end_date)
+    }
+
+def _to_snapshot(user_id, window_days, through_date, totals):
+    return WindowStatsSnapshot(
+        user_id=user_id,
+        window_days=window_days,
+        through_date=through_date,
+        computed_at=datetime.utcnow(),
+        category_totals=[
+            [category_id, t['planned_minutes'], t['completed_minutes'], t['pto_minutes'], t['days']]
+            for category_id, t in totals['categories'].items()
+        ],
+        task_totals=[[task_id, planned, completed] for task_id, (planned, completed) in totals['tasks'].items()]
+    )
+
+def _from_snapshot(snapshot):
+    return {
+        'categories': {
+            category_id: {'planned_minutes': planned, 'completed_minutes': completed,
+                          'pto_minutes': pto, 'days': days}
+            for category_id, planned, completed, pto, days in snapshot.category_totals or []
+        },
+        'tasks': {task_id: (planned, completed) for task_id, planned, completed in snapshot.task_totals or []}
+    }
+
+def _replace_snapshot(session, snapshot):
+    session.query(WindowStatsSnapshot).filter_by(
+        user_id=snapshot.user_id, window_days=snapshot.window_days
+    ).delete(synchronize_session=False)
+    session.add(snapshot)
+
+def store_window_snapshot(user_id, window_days, through_date):
+    """Compute and save the window ending on ``through_date``, replacing older snapshots (caller commits)"""
+    totals = compute_window_totals(user_id, through_date - timedelta(days=window_days - 1), through_date)
+    _replace_snapshot(db.session, _to_snapshot(user_id, window_days, through_date, totals))
+    return totals
+
+def _save_snapshot_separately(snapshot, data_version):
+    """Commit a snapshot on its own connection, leaving the request's transaction (and its
+    SET LOCAL statement timeout) open.
+
+    ``data_version`` is the user's version read before the totals were computed. Writes
+    bump it first and hold the user row until they commit, so a row that is locked now
+    or carries a newer version means a write may have changed (and invalidated) the
+    window meanwhile; the snapshot is then left for the next request to rebuild.
+    """
+    with Session(db.engine) as session:
+        row = session.query(User.data_version).filter(
+            User.id == snapshot.user_id
+        ).with_for_update(skip_locked=True).first()
+        if row is None or (row[0] or 0) != data_version:
+            return
+        try:
+            _replace_snapshot(session, snapshot)
+            session.commit()
+        except IntegrityError:
+            # Another request stored the same snapshot first; ours is identical
+            session.rollback()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error storing window snapshot for user {snapshot.user_id}: {str(e)}")
+
+def _shift(totals, day_totals, sign):
+    for category_id, day in day_totals['categories'].items():
+        entry = totals['categories'].setdefault(
+            category_id, {'planned_minutes': 0, 'completed_minutes': 0, 'pto_minutes': 0.0, 'days': 0}
+        )
+        for key in entry:
+            entry[key] += sign * day[key]
+        if not any(entry.values()):
+            del totals['categories'][category_id]
+    for task_id, (planned, completed) in day_totals['tasks'].items():
+        old_planned, old_completed = totals['tasks'].get(task_id, (0, 0))
+        new_totals = (old_planned + sign * planned, old_completed + sign * completed)
+        if any(new_totals):
+            totals['tasks'][task_id] = new_totals
+        else:
+            totals['tasks'].pop(task_id, None)
+
+def get_window_totals(user_id, window_days, today):
+    """Totals for the ``window_days`` days ending ``today``, merged from yesterday's snapshot.
+
+    A missing or invalidated snapshot is recomputed and stored on the spot, so the
+    next request (and the nightly job) find it ready. Returns the same shape as
+    ``compute_window_totals``.
+    """
+    yesterday = today - timedelta(days=1)
+    snapshot = WindowStatsSnapshot.query.filter_by(
+        user_id=user_id, window_days=window_days, through_date=yesterday
+    ).first()
+
+    if snapshot is not None:
+        totals = _from_snapshot(snapshot)
+    else:
+        data_version = db.session.query(User.data_version).filter(User.id == user_id).scalar() or 0
+        totals = compute_window_totals(user_id, yesterday - timedelta(days=window_days - 1), yesterday)
+        _save_snapshot_separately(_to_snapshot(user_id, window_days, yesterday, totals), data_version)
+
+    dropped_day = today - timedelta(days=window_days)
+    _shift(totals, compute_window_totals(user_id, dropped_day, dropped_day), -1)
+    _shift(totals, compute_window_totals(user_id, today, today), 1)
+    return totals